@@ -0,0 +1,143 @@
+"""Micro-benchmarks for notcallback.async_.
+
+Run with `python benchmarks/bench_async.py [name ...]`. Each benchmark prints its wall-clock time.
+"""
+
+import asyncio
+import sys
+import time
+
+sys.path.insert(0, '.')
+
+from notcallback.async_ import ConcurrencyLimiter, Promise, Scheduler  # noqa: E402
+
+
+def timed(name):
+    def decorate(func):
+        def run(*args, **kwargs):
+            start = time.perf_counter()
+            asyncio.run(func(*args, **kwargs))
+            print('%-48s %8.3fs' % (name, time.perf_counter() - start))
+        run.__name__ = func.__name__
+        BENCHMARKS[func.__name__] = run
+        return run
+    return decorate
+
+
+BENCHMARKS = {}
+
+PROMISES = 1000
+AWAITS = 100
+
+
+async def work():
+    for _ in range(AWAITS):
+        await asyncio.sleep(0)
+    return AWAITS
+
+
+@timed('generator executor, yield per await')
+async def generator_per_await():
+    def executor(resolve, reject):
+        for _ in range(AWAITS):
+            yield asyncio.sleep(0)
+        yield from resolve(AWAITS)
+    await Promise.all(*[Promise(executor) for _ in range(PROMISES)], concurrently=True)
+
+
+@timed('generator executor wrapping a coroutine')
+async def generator_wrapping():
+    def executor(resolve, reject):
+        value = yield work()
+        yield from resolve(value)
+    await Promise.all(*[Promise(executor) for _ in range(PROMISES)], concurrently=True)
+
+
+@timed('async def executor')
+async def native_executor():
+    async def executor(resolve, reject):
+        await resolve(await work())
+    await Promise.all(*[Promise(executor) for _ in range(PROMISES)], concurrently=True)
+
+
+@timed('generator handler wrapping a coroutine')
+async def generator_handler():
+    def handler(value):
+        return (yield work())
+    await Promise.all(*[Promise.resolve().then(handler) for _ in range(PROMISES)], concurrently=True)
+
+
+@timed('async def handler')
+async def native_handler():
+    async def handler(value):
+        return await work()
+    await Promise.all(*[Promise.resolve().then(handler) for _ in range(PROMISES)], concurrently=True)
+
+
+STEPS = 100000
+
+
+@timed('async for over %d awaitables' % STEPS)
+async def async_for_throughput():
+    def executor(resolve, reject):
+        for i in range(STEPS):
+            yield asyncio.sleep(0)
+            if i % 1000 == 0:
+                yield i
+        yield from resolve()
+    async for _ in Promise(executor):
+        pass
+
+
+@timed('await over %d awaitables' % STEPS)
+async def await_throughput():
+    def executor(resolve, reject):
+        for _ in range(STEPS):
+            yield asyncio.sleep(0)
+        yield from resolve()
+    await Promise(executor)
+
+
+SATURATION = 2000
+INTERACTIVE = 100
+
+
+async def interactive_p99(limiter):
+    def job(sec):
+        async def executor(resolve, reject):
+            await asyncio.sleep(sec)
+            await resolve()
+        return Promise(executor)
+
+    async def interactive():
+        start = time.perf_counter()
+        await limiter.run(job(.001), priority=0)
+        return time.perf_counter() - start
+
+    background = asyncio.ensure_future(
+        Promise.all(*[job(.001) for _ in range(SATURATION)], concurrently=True, limiter=limiter).awaitable(),
+    )
+    latencies = []
+    for _ in range(INTERACTIVE):
+        await asyncio.sleep(.002)
+        latencies.append(asyncio.ensure_future(interactive()))
+    latencies = sorted(await asyncio.gather(*latencies))
+    await background
+    return latencies[int(len(latencies) * .99) - 1]
+
+
+@timed('p99 of high-priority promises under saturation')
+async def priority_latency():
+    class FIFO(ConcurrencyLimiter):
+        async def acquire(self, promise=None, **hints):
+            return await super().acquire(promise)
+
+    fifo = await interactive_p99(FIFO(10))
+    scheduled = await interactive_p99(Scheduler(10, priority=lambda p: 1))
+    print('  FIFO ConcurrencyLimiter p99 %8.3fms' % (fifo * 1000))
+    print('  Scheduler               p99 %8.3fms' % (scheduled * 1000))
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
@@ -23,19 +23,221 @@
 """Promise with asyncio."""
 
 import asyncio
+import time
 import warnings
+from contextvars import ContextVar
+from functools import partial, wraps
+from inspect import CORO_CREATED, getcoroutinestate, isasyncgenfunction, isawaitable, iscoroutinefunction
 
 from .exceptions import (AsyncPromiseWarning, PromiseException,
-                         PromiseRejection, PromiseWarning)
+                         PromiseRejection, PromiseTimeout, PromiseWarning)
+from .base import PENDING, REJECTED
+from .limiters import AdaptiveLimiter, Bulkhead, ConcurrencyLimiter, RateLimiter, Scheduler  # noqa: F401
 from .promise import Promise as BasePromise
+from .promise import _Interruption, _passthrough, _reraise
+from .timers import timers_for
 from .utils import one_line_warning_format
 
 try:
+    from typing import AsyncIterator, Optional
     from .promise import PromiseType
 except ImportError:
     pass
 
 
+# The tasks closing async generator executors, collected while `Promise().aclose()` closes a Promise.
+_closing = ContextVar('_closing', default=None)
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _current_task():
+    return asyncio.current_task() if _running_loop() is not None else None
+
+
+def _not_started(task):
+    """Return True if `task` has not taken its first step, so that cancelling it would not run any of its code."""
+    get_coro = getattr(task, 'get_coro', None)
+    return get_coro is not None and getcoroutinestate(get_coro()) == CORO_CREATED
+
+
+class _Deadline:
+    """An awaitable that `await`s another one, and raises PromiseTimeout if it has not finished by `when`.
+
+    The awaitable runs in the awaiting task; at the deadline, the task is cancelled through the loop's `TimerHeap`,
+    and the cancellation is turned into the timeout.
+    """
+
+    __slots__ = ('awaitable', 'when', 'promise')
+
+    def __init__(self, awaitable, when: float, promise):
+        self.awaitable = awaitable
+        self.when = when
+        self.promise = promise
+
+    def __await__(self):
+        return self._run().__await__()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        if loop.time() >= self.when:
+            if asyncio.iscoroutine(self.awaitable):
+                self.awaitable.close()
+            raise PromiseTimeout(self.promise, self.when)
+        task = asyncio.current_task()
+        expired = False
+
+        def expire():
+            nonlocal expired
+            expired = True
+            task.cancel()
+
+        timer = timers_for(loop).call_at(self.when, expire)
+        try:
+            return await self.awaitable
+        except asyncio.CancelledError:
+            if not expired:
+                raise
+            if hasattr(task, 'uncancel'):
+                task.uncancel()
+            raise PromiseTimeout(self.promise, self.when) from None
+        finally:
+            timer.cancel()
+
+
+class _DeadlineGuard:
+    """Wrap the executor of a Promise so that what it `await`s while the Promise is PENDING is bounded by a deadline.
+
+    When the deadline passes, the executor is closed and the Promise rejects with PromiseTimeout.
+    """
+
+    __slots__ = ('promise', 'gen', 'when')
+
+    def __init__(self, promise, gen, when: float):
+        self.promise = promise
+        self.gen = gen
+        self.when = when
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def send(self, value):
+        self._disarm()
+        return self._guard(self.gen.send(value))
+
+    def throw(self, typ, val=None, tb=None):
+        self._disarm()
+        exc = val if val is not None else typ
+        if isinstance(exc, PromiseTimeout) and exc.promise is self.promise and self.promise._state is PENDING:
+            self.gen.close()
+            self.gen = self.promise._reject(exc)
+            return self.send(None)
+        return self._guard(self.gen.throw(typ, val, tb))
+
+    def close(self):
+        self._disarm()
+        self.gen.close()
+
+    def _disarm(self):
+        """Cancel the timer set for what the executor was `await`ing when the deadline was set, which is now done."""
+        timer = self.promise._deadline_timer
+        if timer is not None:
+            self.promise._deadline_timer = None
+            timer.cancel()
+
+    def _guard(self, item):
+        promise = self.promise
+        if promise._state is not PENDING:
+            return item
+        if isinstance(item, _Deadline):
+            if item.when <= self.when:
+                return item
+            awaitable = item
+        else:
+            try:
+                awaitable = promise._as_awaitable(item)
+            except TypeError:
+                return item
+        return _Deadline(awaitable, self.when, promise)
+
+
+class Scope:
+    """An async context manager that owns the Promises started in it, returned by `Promise.scope()`.
+
+    Leaving the `async with` block waits for every Promise started with `start()` to settle. If one of them rejects,
+    the others are cancelled, and the rejection is raised when the block is left. If the block itself raises (or the
+    task running it is cancelled), all of them are cancelled. Either way, no task outlives the scope.
+    """
+
+    __slots__ = ('promise_class', '_pending', '_waiter', '_error', '_closed')
+
+    def __init__(self, promise_class):
+        self.promise_class = promise_class
+        self._pending = set()
+        self._waiter: Optional[asyncio.Future] = None
+        self._error = None
+        self._closed = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def start(self, promise):
+        """Start a Promise (or an awaitable) as an asyncio task owned by the scope, and return the Promise."""
+        if self._closed:
+            raise RuntimeError('Scope is closed')
+        promise = self.promise_class._promisify(promise)
+        if promise._state is not PENDING:
+            return promise
+        promise._add_resolver(promise._observe)
+        self._pending.add(promise)
+        promise.start().add_done_callback(partial(self._done, promise))
+        if self._error is not None:
+            promise.cancel()
+        return promise
+
+    def cancel(self, reason=None):
+        """Cancel all Promises started in the scope that are still pending."""
+        for promise in list(self._pending):
+            promise.cancel(reason)
+
+    def _done(self, promise, task):
+        self._pending.discard(promise)
+        if self._error is None and promise._state is REJECTED and not promise.is_cancelled:
+            self._error = promise._value
+            self.cancel()
+        if not self._pending and self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.cancel()
+        interrupted = None
+        while self._pending:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            except asyncio.CancelledError as e:
+                interrupted = e
+                self.cancel()
+        self._closed = True
+        if interrupted is not None:
+            raise interrupted
+        if exc is None and self._error is not None:
+            _reraise(self._error)
+        return False
+
+
 class Promise(BasePromise):
     """The Promise class extended with async/await support via asyncio.
 
@@ -46,12 +248,17 @@ class Promise(BasePromise):
     --------
     - Promises can be `await`ed
         - `yield`ing an async function when the Promise is being `await`ed will schedule and `await` that function
+        - `yield`ing a list or tuple of awaitables will run them concurrently and send back the list of their results
         - If an `await`ed Promise eventually rejects, the rejection is raised as an exception, allowing exception
         handling using try-except; this mimics the `async/await` behavior in JavaScript.
     - Promises are `AsyncIterator`s, meaning they can be used in `async for`
-        - Any regular values are `yield`ed, and any async functions are `await`ed
+        - Any regular values are `yield`ed, and any async functions (or batches of them) are `await`ed
     - `Promise.all()`, `Promise.race()`, `Promise.all_settled()`, and `Promise.any()` support concurrent execution
     of Promises via `asyncio.as_completed()` (default disabled)
+    - Promises can be started eagerly (`eager=True`, or the `eager` class attribute), in which case the executor is
+    scheduled as an asyncio task as soon as the Promise is created, and `await` simply joins that task
+    - Promises can have deadlines (`Promise().timeout()`), which propagate along `then()` chains
+    - `Promise().cancel()` cancels the task that is running the Promise, whether it was started or is being `await`ed
 
     Interfaces
     ----------
@@ -68,9 +275,11 @@ class Promise(BasePromise):
     This class supports asyncio by translating methods supported by traditional generators to their
     async/await equivalents, thus acting as a middle layer between asyncio and user-defined functions.
 
-    Note that the "support" here means interface-level support only: you can use Promise in async/await functions,
-    but you cannot promisify async functions or use async functions as on-fulfill handlers. Because you should not:
-    if you already have a function defined with `async def`, you should work with asyncio directly.
+    Functions defined with `async def` can also be used as executors and as `then()`, `catch()`, and `finally_()`
+    handlers. Their coroutine is yielded once and `await`ed as a whole by the task evaluating the Promise, so that
+    their body runs natively instead of having each `await` go through the generator translation described below.
+    In an `async def` executor, `resolve` and `reject` are coroutine functions and must be `await`ed.
+    Async generator functions can be used as streaming executors: the values they yield are produced by `async for`.
 
     Arguably, this is doing the opposite of what PEP 492 and 525 are trying to do: whereas these 2 PEPs make clear
     the distinction between a traditional generator, a coroutine, and an async generator, such that,
@@ -110,14 +319,388 @@ class Promise(BasePromise):
     use `await` (there is also a `Promise().awaitable()` method). If you do need intermedia values, use `async for`.
     """
 
+    eager = False
+    concurrent_branches = False
+
+    def __init__(self, executor, *, named=None, eager=None, concurrent_branches=None):
+        """Turn a function into a Promise.
+
+        Parameters
+        ----------
+        executor : Callable
+            A function to be turned into a Promise, see `notcallback.promise.Promise`
+        named : str, optional
+            A name for the Promise, used only in str(), by default None
+        eager : bool, optional
+            whether to schedule the executor as an asyncio task immediately, by default the value of
+            the `eager` class attribute (False)
+        concurrent_branches : bool, optional
+            whether to run the handlers attached to this Promise concurrently once it settles, by default the value
+            of the `concurrent_branches` class attribute (False)
+
+        Description
+        -----------
+        By default, a Promise does nothing until it is `await`ed or iterated over. An eager Promise is started
+        with `Promise().start()` as soon as it is created, so that several Promises created one after another
+        run concurrently even if they are later `await`ed one by one.
+
+        Eager Promises can only be started from within a running event loop. If there is no running loop
+        when the Promise is created, it stays lazy.
+
+        When a Promise has several branches (several `then()`, `catch()`, or `finally_()` Promises attached to it),
+        their handlers are run one after another once it settles. With `concurrent_branches`, they are started
+        in the order they were attached and then run concurrently as asyncio tasks, as long as the Promise is
+        evaluated in a task (`await`ed, started, or used with `async for`; iterating over it synchronously runs
+        them one after another). Intermediate values yielded by the handlers are then discarded instead of being
+        produced by `async for`. Promises chained with `then()`, `catch()`, and `finally_()` inherit the setting,
+        so that their own branches run concurrently as well.
+        """
+        super().__init__(executor, named=named)
+        self._task: Optional[asyncio.Task] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._cancel_requested = False
+        self._deadline: Optional[float] = None
+        self._deadline_timer = None
+        if concurrent_branches is None:
+            concurrent_branches = self.concurrent_branches
+        self._concurrent_branches: bool = concurrent_branches
+        if eager is None:
+            eager = self.eager
+        if eager and _running_loop() is not None:
+            self.start()
+
     @classmethod
-    def _ensure_future(cls, item):
+    def _settled(cls, state, value=None, named=None) -> PromiseType:
+        promise = super()._settled(state, value, named)
+        promise._task = None
+        promise._runner = None
+        promise._cancel_requested = False
+        promise._deadline = None
+        promise._deadline_timer = None
+        promise._concurrent_branches = cls.concurrent_branches
+        return promise
+
+    def start(self) -> asyncio.Task:
+        """Schedule the Promise to run as an asyncio task and return the task.
+
+        Subsequent calls return the same task. `await`ing the Promise, or any Promise chained to it, will join
+        that task instead of running the executor again. Intermediate values yielded by the executor are consumed
+        by the task, so a started Promise no longer produces any items when used with `async for`.
+        """
+        if self._task is None and self._state is PENDING:
+            self._task = asyncio.ensure_future(self._exhaust(self))
+        return self._task
+
+    def _unwind(self):
+        """Cancel the task evaluating the Promise, so that what it is `await`ing is cancelled too.
+
+        The cancellation of the task is turned into the cancellation of the Promise, which the task then evaluates
+        until it settles, `await`ing what `finally_()` handlers yield along the way. Promises that no task is
+        evaluating are started to do so, or evaluated right away if there is no running event loop.
+        """
+        runner = self._task if self._task is not None and not self._task.done() else self._runner
+        if runner is not None and not runner.done():
+            if runner is not asyncio.current_task() and not _not_started(runner) and not self._hands_over(runner):
+                self._cancel_requested = True
+                runner.cancel()
+            return
+        if _running_loop() is None:
+            return super()._unwind()
+        self._task = None
+        self.start()
+
+    def _evaluated_only_by(self, promise) -> bool:
+        if self._task is not None:
+            return False
+        runner = self._running_task()
+        return runner is None or runner is promise._running_task()
+
+    def _hands_over(self, runner) -> bool:
+        """Return True if the Promise was detached from a Promise that `runner` is evaluating on its behalf.
+
+        That Promise is not cancelled along with it: the detached Promise settles at the next step instead, once
+        what `runner` is `await`ing for the other Promise is done, and hands it over to a task of its own.
+        """
+        source = self._exec.source if isinstance(self._exec, _Interruption) else None
+        return source is not None and source._task is None and source._runner is runner
+
+    def _hand_over(self, method, arg):
+        if self._task is None and self._state is PENDING and self._runner is _current_task():
+            self._task = asyncio.ensure_future(self._exhaust(self, getattr(self, method), arg))
+
+    def _take_cancel_request(self):
+        """Return, once, why the task evaluating this Promise was cancelled by the Promise itself, if it was.
+
+        That is True if `Promise().cancel()` cancelled it, and a `PromiseTimeout` to be thrown into the executor if
+        its deadline passed while it was `await`ing something. Otherwise, return False.
+
+        The Promise cancelled may also be one that this Promise evaluates inline, i.e. the one it was chained to with
+        `then()`, etc., if that one has no task of its own.
+        """
+        promise = self
+        while promise is not None:
+            request = promise._cancel_requested
+            if request:
+                promise._cancel_requested = False
+                return request
+            source = promise._source
+            promise = source[0] if source is not None and source[0]._task is None else None
+        return False
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """Return the time before which this Promise must settle, on the event loop clock, or None if there is none."""
+        return self._deadline
+
+    def timeout(self: PromiseType, seconds: float) -> PromiseType:
+        """Make this Promise reject with `PromiseTimeout` if it has not settled within `seconds` from now.
+
+        Parameters
+        ----------
+        seconds : float
+            the time allowed for the Promise to settle
+
+        Returns
+        -------
+        Promise
+            This Promise, so that the call can be chained
+
+        Description
+        -----------
+        The deadline is enforced while the Promise is being run: when it passes, whatever the executor is
+        `await`ing is cancelled, the executor is closed, and the Promise rejects with `PromiseTimeout` (a subclass
+        of `TimeoutError`), so that `await`ing it no longer hangs on a callback that never fires. A Promise that has
+        a deadline already keeps the earlier of the two.
+
+        This also applies to a Promise that is already running, e.g. an eager one, or one that another task is
+        `await`ing: the task running it is interrupted at the deadline, whatever it is `await`ing at the time.
+
+        Deadlines propagate along chains: Promises created with `then()`, `catch()`, and `finally_()` inherit the
+        deadline of this Promise, including the time their own handlers take.
+
+        All deadlines on an event loop share a single timer (see `notcallback.timers`).
+        """
+        loop = _running_loop()
+        self._set_deadline((loop.time() if loop is not None else time.monotonic()) + seconds)
+        return self
+
+    def _set_deadline(self, when: Optional[float]):
+        if when is None or self._state is not PENDING:
+            return
+        if self._deadline is not None and self._deadline <= when:
+            return
+        self._deadline = when
+        if isinstance(self._exec, _DeadlineGuard):
+            self._exec.when = when
+        else:
+            self._exec = _DeadlineGuard(self, self._exec, when)
+        runner = self._running_task()
+        if runner is not None:
+            # The executor is suspended in `runner`, `await`ing something that the guard did not see.
+            if self._deadline_timer is not None:
+                self._deadline_timer.cancel()
+            self._deadline_timer = timers_for(asyncio.get_running_loop()).call_at(when, partial(self._expire, when))
+
+    def _running_task(self) -> Optional[asyncio.Task]:
+        """Return the task in which the executor is suspended, if it has taken a step in one."""
+        runner = self._task if self._task is not None and not self._task.done() else self._runner
+        if runner is None or runner.done() or _not_started(runner):
+            return None
+        return runner
+
+    def _expire(self, when: float):
+        """Interrupt the task running the Promise because its deadline passed while it was `await`ing."""
+        self._deadline_timer = None
+        runner = self._running_task()
+        if self._state is PENDING and self._deadline == when and runner is not None:
+            self._cancel_requested = PromiseTimeout(self, when)
+            runner.cancel()
+
+    def _prepare(self, executor, named=None):
+        super()._prepare(self._adapt_executor(executor), named)
+
+    @classmethod
+    def _async_settler(cls, settle):
+        """Turn `resolve` or `reject` into a coroutine function for use in `async def` executors."""
+        @wraps(settle)
+        async def settler(value=None):
+            return await cls._exhaust(settle(value))
+        return settler
+
+    @classmethod
+    def _iterate_async_gen(cls, agen):
+        try:
+            while True:
+                try:
+                    item = yield agen.__anext__()
+                except StopAsyncIteration:
+                    return
+                yield item
+        except GeneratorExit:
+            # `yield from` turns a GeneratorExit into close(), during which nothing can be yielded: the async generator
+            # is closed in a task instead, which `Promise().aclose()` waits for.
+            if _running_loop() is not None:
+                task = asyncio.ensure_future(agen.aclose())
+                closing = _closing.get()
+                if closing is not None:
+                    closing.append(task)
+            raise
+        except BaseException:
+            yield agen.aclose()
+            raise
+
+    @classmethod
+    def _adapt_handler(cls, func):
+        """Wrap an `async def` function or async generator function in a generator function.
+
+        The coroutine is yielded once and `await`ed as a whole, and the async generator is stepped through with
+        `__anext__()`, so that the function body itself runs natively. Other functions are returned as-is.
+        """
+        if iscoroutinefunction(func):
+            @wraps(func)
+            def run_coroutine(*args, **kwargs):
+                return (yield func(*args, **kwargs))
+            return run_coroutine
+        if isasyncgenfunction(func):
+            @wraps(func)
+            def run_async_gen(*args, **kwargs):
+                yield from cls._iterate_async_gen(func(*args, **kwargs))
+            return run_async_gen
+        return func
+
+    @classmethod
+    def _adapt_executor(cls, executor):
+        handler = cls._adapt_handler(executor)
+        if handler is executor:
+            return executor
+
+        @wraps(executor)
+        def run_async_executor(resolve, reject):
+            return (yield from handler(cls._async_settler(resolve), cls._async_settler(reject)))
+        return run_async_executor
+
+    def then(self: PromiseType, on_fulfill=_passthrough, on_reject=_reraise) -> PromiseType:
+        """Return a new Promise that waits for this Promise to settle and then reacts accordingly.
+
+        Same as `notcallback.promise.Promise.then`, except that the handlers may also be `async def` functions
+        or async generator functions.
+        """
+        return self._inherit(super().then(self._adapt_handler(on_fulfill), self._adapt_handler(on_reject)))
+
+    def finally_(self: PromiseType, on_settle=lambda: None) -> PromiseType:
+        """Return a Promise whose handler will run regardless of how the previous Promise was settled.
+
+        Same as `notcallback.promise.Promise.finally_`, except that the handler may also be an `async def` function
+        or async generator function.
+        """
+        return self._inherit(super().finally_(self._adapt_handler(on_settle)))
+
+    def _inherit(self, promise: PromiseType) -> PromiseType:
+        """Pass the deadline and the `concurrent_branches` setting of this Promise on to a Promise chained to it."""
+        promise._set_deadline(self._deadline)
+        if self._concurrent_branches:
+            promise._concurrent_branches = True
+        return promise
+
+    @classmethod
+    def _sleep(cls, seconds: float):
+        if seconds > 0:
+            yield asyncio.sleep(seconds)
+
+    def _join(self):
+        """Wait for the task started with `Promise().start()`, if any, without taking ownership of it."""
+        task = self._task
+        if task is not None and not task.done():
+            yield asyncio.shield(task)
+
+    def _successor_executor(self, resolve=None, reject=None):
+        if self._task is None and self._state is PENDING and _running_loop() is not None:
+            runner = self._running_task()
+            if runner is None and len(self._resolvers) > 1:
+                # Promises with several branches run in a task of their own, so that cancelling a branch does not
+                # interrupt what they are `await`ing.
+                self.start()
+            elif runner is not None and runner is not asyncio.current_task():
+                # Another task is evaluating the Promise inline: let it settle the Promise and run the resolvers.
+                yield from self._wait_for_settlement()
+        if self._task is None:
+            runner = None
+            if self._state is PENDING and self._running_task() is None:
+                runner = self._runner = _current_task()
+            try:
+                return (yield from super()._successor_executor(resolve, reject))
+            finally:
+                if runner is not None:
+                    self._runner = None
+        yield from self._join()
+        if self._resolvers:
+            yield from self._run_resolvers()
+
+    def _wait_for_settlement(self):
+        settled = asyncio.get_running_loop().create_future()
+
+        def resolver(promise):
+            if not settled.done():
+                settled.set_result(None)
+            return
+            yield
+
+        self._add_resolver(resolver)
+        yield settled
+
+    def _run_resolvers(self):
+        runner = self._running_task()
+        if not self._concurrent_branches or len(self._resolvers) < 2 or runner is None or runner is not _current_task():
+            # Branches only run concurrently in a task evaluating this Promise: the batch of tasks is `await`ed there,
+            # instead of being produced as an item when the Promise is iterated over synchronously.
+            return (yield from super()._run_resolvers())
+        while self._resolvers:
+            gens = [resolver(self) for resolver in self._resolvers]
+            self._resolvers.clear()
+            yield [self._exhaust(gen) for gen in gens]
+
+    @classmethod
+    def _resolve_promise(cls, this: PromiseType, returned):
+        if isinstance(returned, cls) and returned._task is not None:
+            yield from returned._join()
+        return (yield from super()._resolve_promise(this, returned))
+
+    @classmethod
+    def _is_batch(cls, item):
+        return isinstance(item, (list, tuple)) and len(item) > 0 and all(isawaitable(i) for i in item)
+
+    @classmethod
+    def _schedule(cls, item):
+        if isinstance(item, Promise):
+            item = item.awaitable()
+        return asyncio.ensure_future(item)
+
+    @classmethod
+    async def _gather_batch(cls, items):
+        futures = [cls._schedule(i) for i in items]
         try:
-            return asyncio.ensure_future(item)
-        except TypeError:
-            future = asyncio.Future()
-            future.set_result(item)
-            return future
+            return await asyncio.gather(*futures)
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            raise
+
+    @classmethod
+    def _as_awaitable(cls, item):
+        """Return an awaitable to be `await`ed in place of an item yielded by an executor or handler.
+
+        Promises are `await`ed through `Promise().awaitable()`, and lists or tuples of awaitables are gathered.
+        Other awaitables are returned as-is and run in the awaiting task instead of a task of their own.
+
+        Raise TypeError if `item` is not awaitable.
+        """
+        if isinstance(item, Promise):
+            return item.awaitable()
+        if isawaitable(item):
+            return item
+        if cls._is_batch(item):
+            return cls._gather_batch(item)
+        raise TypeError('%s is not awaitable' % repr(item))
 
     async def awaitable(self):
         """Return an `Awaitable`. `await`ing which will settle the Promise.
@@ -127,18 +710,17 @@ class Promise(BasePromise):
         reason
         PromiseRejection
             If the Promise eventually rejects, the reason is raised.
+        asyncio.CancelledError
+            If the task running the Promise is cancelled, the Promise is left PENDING.
         """
-        value = None
-        while True:
+        if self._task is None:
+            self._runner = asyncio.current_task()
             try:
-                try:
-                    value = await self._ensure_future(self.send(value))
-                except asyncio.CancelledError:
-                    break
-                except BaseException as e:
-                    value = self.throw(e)
-            except StopIteration:
-                break
+                await self._exhaust(self)
+            finally:
+                self._runner = None
+        elif not self._task.done():
+            await asyncio.shield(self._task)
         if self.is_fulfilled:
             return self._value
         elif self.is_rejected:
@@ -153,8 +735,45 @@ class Promise(BasePromise):
             ))
 
     @classmethod
-    async def _ensure_completion(cls, promise):
+    async def _exhaust(cls, gen, method=None, arg=None):
+        """Run a generator to completion, `await`ing everything it yields and sending back the results.
+
+        The first step sends `arg` with `method` (by default, sends None), for generators that are already running.
+        """
+        method = method or gen.send
+        while True:
+            try:
+                item = method(arg)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                awaitable = cls._as_awaitable(item)
+            except TypeError:
+                method, arg = gen.send, item
+                continue
+            try:
+                method, arg = gen.send, await awaitable
+            except asyncio.CancelledError:
+                request = isinstance(gen, Promise) and gen._take_cancel_request()
+                if not request:
+                    raise
+                # Promise().cancel() cancelled this task; the interrupted executor raises PromiseCancelled instead.
+                cls._uncancel()
+                method, arg = (gen.send, None) if request is True else (gen.throw, request)
+            except BaseException as e:
+                method, arg = gen.throw, e
+
+    @staticmethod
+    def _uncancel():
+        task = asyncio.current_task()
+        if hasattr(task, 'uncancel'):
+            task.uncancel()
+
+    @classmethod
+    async def _ensure_completion(cls, promise, limiter=None):
         try:
+            if limiter is not None:
+                return await limiter.run(promise)
             return await promise.awaitable()
         except (PromiseException, GeneratorExit, KeyboardInterrupt, SystemExit):
             raise
@@ -162,19 +781,28 @@ class Promise(BasePromise):
             pass
 
     @classmethod
-    def _make_concurrent_executor(cls, this: PromiseType, promises):
+    def _make_concurrent_executor(cls, this: PromiseType, promises, limiter=None, cancel_leftovers=False):
         def executor(resolve, reject):
-            futures = [asyncio.ensure_future(cls._ensure_completion(p)) for p in promises]
-            awaitables = asyncio.as_completed(futures)
-            yield from awaitables
+            futures = [asyncio.ensure_future(cls._ensure_completion(p, limiter)) for p in promises]
+            try:
+                for awaitable in asyncio.as_completed(futures):
+                    yield awaitable
+                    if cancel_leftovers and this._state is not PENDING:
+                        break
+            finally:
+                if cancel_leftovers:
+                    for future in futures:
+                        future.cancel()
         return executor
 
     @classmethod
-    def _dispatch_aggregate_methods(cls, func, *promises, concurrently=False):
+    def _dispatch_aggregate_methods(cls, func, *promises, concurrently=False, limiter=None, cancel_leftovers=False):
+        if limiter is not None and not concurrently:
+            raise ValueError('limiter can only be used with concurrently=True')
         promise = func(*promises)
         if not concurrently:
             return promise
-        promise._prepare(cls._make_concurrent_executor(promise, promises))
+        promise._prepare(cls._make_concurrent_executor(promise, promises, limiter, cancel_leftovers))
         return promise
 
     @classmethod
@@ -187,6 +815,9 @@ class Promise(BasePromise):
             Promises to be evaluated
         concurrently : bool, optional
             whether to run the Promises concurrently using asyncio; if not, Promises are run sequetially, by default False
+        limiter : ConcurrencyLimiter, optional
+            a limiter from `notcallback.limiters` deciding when each Promise may start, only with `concurrently=True`,
+            by default all Promises start at once
 
         Description
         -----------
@@ -216,6 +847,9 @@ class Promise(BasePromise):
             Promises to be evaluated
         concurrently : bool, optional
             whether to run the Promises concurrently using asyncio; if not, Promises are run sequetially, by default False
+        limiter : ConcurrencyLimiter, optional
+            a limiter from `notcallback.limiters` deciding when each Promise may start, only with `concurrently=True`,
+            by default all Promises start at once
 
         Description
         -----------
@@ -248,6 +882,9 @@ class Promise(BasePromise):
             Promises to be evaluated
         concurrently : bool, optional
             whether to run the Promises concurrently using asyncio; if not, Promises are run sequetially, by default False
+        limiter : ConcurrencyLimiter, optional
+            a limiter from `notcallback.limiters` deciding when each Promise may start, only with `concurrently=True`,
+            by default all Promises start at once
 
         Description
         -----------
@@ -270,6 +907,9 @@ class Promise(BasePromise):
             Promises to be evaluated
         concurrently : bool, optional
             whether to run the Promises concurrently using asyncio; if not, Promises are run sequetially, by default False
+        limiter : ConcurrencyLimiter, optional
+            a limiter from `notcallback.limiters` deciding when each Promise may start, only with `concurrently=True`,
+            by default all Promises start at once
 
         Description
         -----------
@@ -287,21 +927,458 @@ class Promise(BasePromise):
         """
         return cls._dispatch_aggregate_methods(super().any, *args, **kwargs)
 
-    async def _dispatch_async_gen_method(self, func, *args, **kwargs):
+    @classmethod
+    def some(cls, k, *args, **kwargs) -> PromiseType:
+        """Return a new Promise that fulfills as soon as `k` of the provided Promises are FULFILLED.
+
+        If `k` of them can no longer fulfill, it rejects with a PromiseAggregateError.
+
+        Parameters
+        ----------
+        k : int
+            the number of Promises that must fulfill
+        *promises : Promise
+            Promises to be evaluated
+        concurrently : bool, optional
+            whether to run the Promises concurrently using asyncio; if not, Promises are run sequetially, by default False
+        limiter : ConcurrencyLimiter, optional
+            a limiter from `notcallback.limiters` deciding when each Promise may start, only with `concurrently=True`,
+            by default all Promises start at once
+
+        Description
+        -----------
+        Employs the same logic as the non-async version (`notcallback.promise.Promise.some`), but with optional support
+        for concurrency.
+
+        Note
+        ----
+        Unlike the other aggregation methods, when run with `concurrently=True`, the Promises that are still pending
+        once this Promise has settled are cancelled, so that e.g. a quorum read finishes with the `k`-th fastest replica
+        instead of the slowest one. The cancelled Promises are left PENDING.
+        """
+        return cls._dispatch_aggregate_methods(partial(super().some, k), *args, cancel_leftovers=True, **kwargs)
+
+    @classmethod
+    def as_completed(cls, *promises, limiter=None) -> AsyncIterator[PromiseType]:
+        """Return an async iterator that produces each of the provided Promises as soon as it has settled.
+
+        Parameters
+        ----------
+        *promises : Promise
+            Promises to be evaluated
+        limiter : ConcurrencyLimiter, optional
+            a limiter from `notcallback.limiters` deciding when each Promise may start, by default all Promises
+            start at once
+
+        Description
+        -----------
+        The Promises are run concurrently, and produced with `async for` in the order they settle, whether they are
+        FULFILLED or REJECTED; their rejections are considered handled. Promises that are already settled are produced
+        first. Only the Promises that have settled but have not been consumed yet are buffered.
+
+        Breaking out of the `async for` loop early and closing the iterator (e.g. with `aclose()`) cancels the Promises
+        that are still pending.
+        """
+        cls._ensure_promise(promises)
+        return cls._as_completed(promises, limiter)
+
+    @classmethod
+    async def _as_completed(cls, promises, limiter):
+        queue = asyncio.Queue()
+        tasks = []
+        for p in promises:
+            if p._state is not PENDING:
+                queue.put_nowait(p)
+                continue
+            p._add_resolver(cls._observe)
+            task = asyncio.ensure_future(cls._ensure_completion(p, limiter))
+            task.add_done_callback(lambda _, p=p: queue.put_nowait(p))
+            tasks.append(task)
         try:
-            item = self._dispatch_gen_method(func, *args, **kwargs)
-        except StopIteration:
-            raise StopAsyncIteration()
+            for _ in range(len(promises)):
+                yield await queue.get()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @classmethod
+    def paginate(cls, fetch_page, next_cursor, cursor=None, *, prefetch: int = 1) -> AsyncIterator:
+        """Return an async iterator over the pages of a paginated resource, fetching up to `prefetch` pages ahead.
+
+        Parameters
+        ----------
+        fetch_page : Callable
+            a function that takes a cursor and returns a Promise (or an awaitable, or a plain value) of the page at
+            that cursor
+        next_cursor : Callable
+            a function that takes a page and returns the cursor of the page after it, or None if it is the last one
+        cursor : optional
+            the cursor of the first page, by default None
+        prefetch : int, optional
+            the maximum number of pages fetched but not yet consumed, by default 1; with 0, each page is only
+            fetched when the consumer asks for it
+
+        Description
+        -----------
+        The pages are produced with `async for`, in order. While the consumer processes a page, a task fetches the
+        next ones, each as soon as the cursor for it is known. Once `prefetch` pages are waiting to be consumed, the
+        task waits for the consumer to catch up, so the memory used stays the same however many pages there are.
+        If the Promise of a page rejects, the iterator raises the reason once it gets to that page.
+
+        Breaking out of the `async for` loop early and closing the iterator (e.g. with `aclose()`) cancels the page
+        that is being fetched.
+        """
+        if prefetch < 0:
+            raise ValueError('prefetch must not be negative')
+        if not prefetch:
+            return cls._paginate(fetch_page, next_cursor, cursor)
+        return cls._paginate_ahead(fetch_page, next_cursor, cursor, prefetch)
+
+    @classmethod
+    async def _paginate(cls, fetch_page, next_cursor, cursor):
+        while True:
+            page = await cls._promisify(fetch_page(cursor))
+            cursor = next_cursor(page)
+            yield page
+            if cursor is None:
+                return
+
+    @classmethod
+    async def _paginate_ahead(cls, fetch_page, next_cursor, cursor, prefetch):
+        # Each page is represented in the queue by a future put there before the page is fetched, so the queue
+        # bounds the pages that are being fetched or waiting to be consumed.
+        queue = asyncio.Queue(prefetch)
+        fetching = None
+        closed = False
+
+        async def produce(cursor):
+            nonlocal fetching
+            loop = asyncio.get_running_loop()
+            while True:
+                slot = loop.create_future()
+                await queue.put(slot)
+                try:
+                    fetching = cls._promisify(fetch_page(cursor))
+                    page = await fetching
+                    cursor = next_cursor(page)
+                except asyncio.CancelledError:
+                    slot.cancel()
+                    raise
+                except BaseException as e:
+                    if not closed:
+                        slot.set_exception(e)
+                    return
+                finally:
+                    fetching = None
+                slot.set_result((page, cursor))
+                if cursor is None:
+                    return
+
+        producer = asyncio.ensure_future(produce(cursor))
         try:
-            future = asyncio.ensure_future(item)
-        except TypeError:
-            return item
+            while True:
+                page, cursor = await (await queue.get())
+                yield page
+                if cursor is None:
+                    return
+        finally:
+            closed = True
+            if fetching is None or not fetching.cancel():
+                producer.cancel()
+            while not queue.empty():
+                slot = queue.get_nowait()
+                if slot.done() and not slot.cancelled():
+                    slot.exception()
+
+    @classmethod
+    async def _run_map(cls, iterable, factory, limit, emit, limiter=None):
+        """Run `factory` over `iterable` with at most `limit` results pending at a time.
+
+        Inputs are pulled lazily as workers free up. If a `limiter` is given, each result also waits for
+        the limiter before being awaited. Each result is passed to the coroutine function `emit`
+        together with the index of its input. Once an input fails, no more inputs are pulled, and the results
+        already pending are allowed to finish. Return `(True, reason)` for the first failure,
+        or `(False, None)` if there was none.
+        """
+        if limit is None:
+            iterable = list(iterable)
+            limit = max(len(iterable), 1)
+        elif limit < 1:
+            raise ValueError('limit must be at least 1')
+        inputs = enumerate(iterable)
+        failures = []
+
+        async def worker():
+            while not failures:
+                try:
+                    index, item = next(inputs)
+                except StopIteration:
+                    return
+                except BaseException as e:
+                    failures.append(e)
+                    return
+                try:
+                    result = factory(item)
+                    if limiter is not None and isinstance(result, BasePromise):
+                        value = await limiter.run(result)
+                    else:
+                        try:
+                            awaitable = cls._as_awaitable(result)
+                        except TypeError:
+                            value = result
+                        else:
+                            value = await (limiter.run(awaitable) if limiter is not None else awaitable)
+                except (PromiseException, PromiseWarning, GeneratorExit, KeyboardInterrupt, SystemExit):
+                    raise
+                except BaseException as e:
+                    failures.append(e)
+                    return
+                await emit(index, value)
+
+        await asyncio.gather(*[worker() for _ in range(limit)])
+        if failures:
+            return True, failures[0]
+        return False, None
+
+    @classmethod
+    def map(cls, iterable, factory, *, limit=None, limiter=None) -> PromiseType:
+        """Return a new Promise that fulfills with the results of calling `factory` on each item of `iterable`.
+
+        Parameters
+        ----------
+        iterable : Iterable
+            inputs, which are pulled lazily as previous Promises settle
+        factory : Callable
+            a function that takes one input and returns a Promise, an awaitable, or a plain value
+        limit : int, optional
+            the maximum number of Promises pending at the same time, by default unlimited (in which case
+            `iterable` is read in full beforehand)
+        limiter : ConcurrencyLimiter, optional
+            a limiter from `notcallback.limiters` that each Promise waits for before it starts, for example
+            a `Scheduler` shared with other work, by default none
+
+        Description
+        -----------
+        Unlike `Promise.all(..., concurrently=True)`, which starts every Promise at once, `Promise.map()` keeps
+        at most `limit` Promises in flight and only creates the next one when a slot frees up.
+
+        The Promise fulfills with the list of results, in the same order as the inputs. If one of the Promises
+        rejects, no more Promises are created, the ones that are still pending are run to completion, and then
+        the Promise rejects with the reason of the first rejection.
+
+        See also `Promise.map_unordered()`.
+
+        Returns
+        -------
+        Promise
+            The new Promise
+        """
+        def executor(resolve, reject):
+            results = {}
+
+            async def collect(index, value):
+                results[index] = value
+
+            failed, reason = yield cls._run_map(iterable, factory, limit, collect, limiter)
+            if failed:
+                yield from reject(reason)
+            else:
+                yield from resolve([results[i] for i in range(len(results))])
+        return cls(executor, named='Promise.map')
+
+    @classmethod
+    def map_unordered(cls, iterable, factory, *, limit=None, limiter=None) -> PromiseType:
+        """Return a new Promise that runs `factory` over `iterable` like `Promise.map()`, but streams the results.
+
+        When used with `async for`, the Promise produces each result as soon as it is available, in the order the
+        Promises settle. Results that are not consumed yet are buffered, and at most `limit` of them are buffered
+        before no more Promises are created, so a slow consumer also slows down the producers.
+
+        The Promise fulfills with None once all results have been produced, or rejects with the reason of the first
+        rejection, after the results of the Promises that were still pending have been produced.
+
+        Breaking out of the `async for` loop early and closing the Promise (e.g. with `aclose()`) stops creating
+        new Promises.
+
+        Like `Promise.map()`, accepts a `limiter` that each Promise waits for before it starts.
+        """
+        def executor(resolve, reject):
+            queue = asyncio.Queue()
+            room = asyncio.Semaphore(limit) if limit else None
+            done = object()
+
+            async def emit(index, value):
+                if room is not None:
+                    await room.acquire()
+                queue.put_nowait(value)
+
+            task = asyncio.ensure_future(cls._run_map(iterable, factory, limit, emit, limiter))
+            task.add_done_callback(lambda _: queue.put_nowait(done))
+            try:
+                while True:
+                    item = yield queue.get()
+                    if item is done:
+                        break
+                    if room is not None:
+                        room.release()
+                    yield item
+                failed, reason = yield task
+            finally:
+                if not task.done():
+                    task.cancel()
+            if failed:
+                yield from reject(reason)
+            else:
+                yield from resolve()
+        return cls(executor, named='Promise.map_unordered')
+
+    @classmethod
+    def _promisify(cls, value) -> PromiseType:
+        """Return `value` if it is a Promise, or else a Promise that `await`s it if it is awaitable or fulfills with it."""
+        if isinstance(value, cls):
+            return value
+
+        def executor(resolve, reject):
+            result = (yield value) if isawaitable(value) else value
+            yield from resolve(result)
+        return cls(executor, named=getattr(value, '__qualname__', None))
+
+    @classmethod
+    def hedge(cls, factory, *, delay, max_hedges: int = 1) -> PromiseType:
+        """Return a new Promise that calls `factory` to make a Promise, and makes backup Promises if it is slow.
+
+        Parameters
+        ----------
+        factory : Callable
+            a function that takes no arguments and returns a Promise (or an awaitable); it is called once per attempt
+        delay : Union[float, Callable]
+            how long to wait, in seconds, for an attempt to settle before starting the next one; either a number or a
+            function returning one, e.g. a `notcallback.resilience.LatencyTracker`, which then also records the
+            latency of the attempts that fulfill, so that the delay follows e.g. the observed p95 latency
+        max_hedges : int, optional
+            the maximum number of backup attempts, by default 1
+
+        Description
+        -----------
+        The first attempt starts right away. Each time `delay` passes without the Promise settling, or as soon as an
+        attempt rejects, another attempt starts, up to `1 + max_hedges` attempts in total. Like with `Promise.race()`,
+        the Promise adopts the first attempt to fulfill; unlike it, it does not wait for the slower attempts, which are
+        cancelled right away. If all attempts reject, the Promise rejects with the reason of the last rejection.
+
+        Since the same call may then run several times, `factory` should be safe to call more than once (idempotent).
+
+        Returns
+        -------
+        Promise
+            The new Promise
+        """
+        if max_hedges < 0:
+            raise ValueError('max_hedges cannot be negative')
+        observe = getattr(delay, 'observe', None)
+        next_delay = delay if callable(delay) else (lambda: delay)
+
+        def executor(resolve, reject):
+            loop = asyncio.get_running_loop()
+            tasks = set()
+            rejections = []
+
+            def make_resolver(start):
+                def resolver(settled: PromiseType):
+                    if promise._state is not PENDING:
+                        return
+                    if settled._state is REJECTED:
+                        rejections.append(settled._value)
+                        return
+                    if observe is not None:
+                        observe(loop.time() - start)
+                    yield from promise._adopt(settled)
+                return resolver
+
+            def launch():
+                try:
+                    attempt = cls._promisify(factory())
+                except (PromiseException, PromiseWarning, GeneratorExit, KeyboardInterrupt, SystemExit):
+                    raise
+                except BaseException as e:
+                    attempt = cls.reject(e)
+                attempt._add_resolver(make_resolver(loop.time()))
+                tasks.add(asyncio.ensure_future(cls._ensure_completion(attempt)))
+
+            try:
+                launch()
+                launched = 1
+                while promise._state is PENDING and tasks:
+                    timeout = next_delay() if launched <= max_hedges else None
+                    done, _ = yield asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    tasks.difference_update(done)
+                    if promise._state is PENDING and launched <= max_hedges:
+                        launch()
+                        launched += 1
+            finally:
+                for task in tasks:
+                    task.cancel()
+            if promise._state is PENDING:
+                yield from reject(rejections[-1])
+
+        promise = cls(executor, named='Promise.hedge')
+        return promise
+
+    @classmethod
+    def scope(cls) -> Scope:
+        """Return a `Scope`, an async context manager that owns the Promises started with its `start()` method.
+
+        Description
+        -----------
+        Tasks started with `Promise().start()` or `concurrently=True` have no owner: if the code that started them
+        fails, they keep running. Promises started with `Scope().start()` instead belong to the scope. Leaving the
+        `async with` block waits for all of them, with one done-callback per task and no polling. The first
+        rejection cancels the rest (with `Promise().cancel()`) and is raised when the block is left; an exception in
+        the block, or the cancellation of the task running it, cancels all of them.
+
+        >>> async with Promise.scope() as s:
+        >>>     pages = [s.start(fetch(url)) for url in urls]
+        >>> return [page.value for page in pages]
+        """
+        return Scope(cls)
+
+    async def _dispatch_async_gen_method(self, method, *args):
+        """Step through the executor until it yields a non-awaitable item, and return the item.
+
+        Awaitables yielded along the way are `await`ed in a loop, and their results (or exceptions) are sent
+        (or thrown) back into the executor, so that the coroutine depth stays the same regardless of how many
+        times the executor `await`s.
+        """
+        if self._task is not None:
+            if not self._task.done():
+                await asyncio.shield(self._task)
+            raise StopAsyncIteration()
+        self._runner = asyncio.current_task()
         try:
-            return await self.asend(await future)
-        except (PromiseException, PromiseWarning, GeneratorExit, KeyboardInterrupt, SystemExit):
-            raise
-        except BaseException as e:
-            return await self.athrow(e)
+            while True:
+                try:
+                    item = self._dispatch_gen_method(getattr(self._exec, method), *args)
+                except StopIteration:
+                    raise StopAsyncIteration()
+                try:
+                    awaitable = self._as_awaitable(item)
+                except TypeError:
+                    return item
+                try:
+                    method, args = 'send', (await awaitable,)
+                except (PromiseException, PromiseWarning, GeneratorExit, KeyboardInterrupt, SystemExit):
+                    raise
+                except asyncio.CancelledError as e:
+                    request = self._take_cancel_request()
+                    if not request:
+                        method, args = 'throw', (e,)
+                        continue
+                    self._uncancel()
+                    method, args = ('send', (None,)) if request is True else ('throw', (request,))
+                except BaseException as e:
+                    method, args = 'throw', (e,)
+        finally:
+            self._runner = None
 
     def __await__(self):
         return self.awaitable().__await__()
@@ -310,24 +1387,23 @@ class Promise(BasePromise):
         return self
 
     async def __anext__(self):
-        return await self._dispatch_async_gen_method(self._exec.__next__)
+        return await self._dispatch_async_gen_method('__next__')
 
     async def asend(self, val):
-        return await self._dispatch_async_gen_method(self._exec.send, val)
+        return await self._dispatch_async_gen_method('send', val)
 
     async def athrow(self, typ, val=None, tb=None):
-        return await self._dispatch_async_gen_method(self._exec.throw, typ, val, tb)
+        return await self._dispatch_async_gen_method('throw', typ, val, tb)
 
     async def aclose(self):
+        closing = []
+        token = _closing.set(closing)
         try:
-            i = await self.athrow(GeneratorExit)
-            while True:
-                try:
-                    await asyncio.ensure_future(i)
-                except TypeError:
-                    raise RuntimeError('Generator cannot yield non-awaitables during exit.')
-                i = await self.__anext__()
+            await self.athrow(GeneratorExit)
         except (GeneratorExit, StopAsyncIteration):
-            pass
-        else:
-            raise RuntimeError('Generator ignored GeneratorExit')
+            return
+        finally:
+            _closing.reset(token)
+            for task in closing:
+                await task
+        raise RuntimeError('Generator cannot yield non-awaitables during exit.')
@@ -0,0 +1,349 @@
+# MIT License
+#
+# Copyright (c) 2020 Tony Wu <tony[dot]wu(at)nyu[dot]edu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Coalescing many small Promise-producing calls into fewer, larger ones."""
+
+import asyncio
+from collections import deque
+from functools import partial
+from inspect import isawaitable
+
+from .async_ import Promise as AsyncPromise
+from .base import FULFILLED
+from .promise import Promise, _reraise
+from .timers import timers_for
+
+try:
+    from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Type
+except ImportError:
+    pass
+
+
+class _Batch:
+    __slots__ = ('keys', 'promise', 'ready')
+
+    def __init__(self, ready=None):
+        self.keys: List[Hashable] = []
+        self.promise: Optional[Promise] = None
+        self.ready: Optional[asyncio.Future] = ready
+
+
+class BatchLoader:
+    """Collect the keys of many `load()` calls and load them with one call to a batch function.
+
+    `load(key)` returns a Promise for the value of `key`. Keys are collected into a batch and deduplicated, and the
+    batch is passed to `batch_fn(keys)`, which must return a sequence of values in the same order (or a Promise of
+    one, or with `notcallback.async_.Promise`, an awaitable of one). Each Promise then fulfills with the value for its
+    key, or rejects if that value is an exception, or if `batch_fn` fails.
+
+    With `notcallback.async_.Promise`, the keys loaded during one iteration of the event loop make up a batch, which
+    is dispatched at the end of that iteration. The returned Promises are started right away. With the synchronous
+    Promise, a batch is dispatched when the first of its Promises is evaluated, or by calling `flush()`, so that e.g.
+    all keys in `Promise.all(*[loader.load(k) for k in keys])` are loaded together.
+
+    Parameters
+    ----------
+    batch_fn : Callable[[List], Sequence]
+        The function that loads a batch of keys.
+    promise_class : type
+        The Promise class to return.
+    max_batch_size : int, optional
+        The most keys to pass to `batch_fn` at once. Larger batches are split.
+    cache : bool
+        Whether to keep the Promise for each key, so that loading it again returns the same Promise instead of being
+        part of another batch. Promises that reject are not kept. Without caching, keys are still deduplicated within
+        a batch.
+    """
+
+    def __init__(
+        self, batch_fn: Callable[[List[Hashable]], Sequence], promise_class: Type[Promise] = Promise, *,
+        max_batch_size: Optional[int] = None, cache: bool = True,
+    ):
+        if max_batch_size is not None and max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.batch_fn = batch_fn
+        self.promise_class = promise_class
+        self.max_batch_size = max_batch_size
+        self.cache = cache
+        self._async = issubclass(promise_class, AsyncPromise)
+        self._promises: Dict[Hashable, Promise] = {}
+        self._batch: Optional[_Batch] = None
+        self._queued: List[_Batch] = []
+        self.batches = 0
+
+    def load(self, key: Hashable) -> Promise:
+        """Return a Promise for the value of `key`, which is loaded with the next batch."""
+        promise = self._promises.get(key)
+        if promise is not None:
+            return promise
+        batch = self._batch
+        if batch is None:
+            batch = self._batch = self._open_batch()
+        index = len(batch.keys)
+        batch.keys.append(key)
+        if len(batch.keys) == self.max_batch_size:
+            self._batch = None
+
+        def executor(resolve, reject):
+            if batch.promise is None:
+                if batch.ready is not None:
+                    yield asyncio.shield(batch.ready)
+                else:
+                    self._dispatch(batch)
+            size = len(batch.keys)
+
+            def pick(values):
+                if len(values) != size:
+                    raise ValueError('batch_fn returned %d values for %d keys' % (len(values), size))
+                value = values[index]
+                if isinstance(value, BaseException):
+                    raise value
+                return value
+
+            def evict(reason):
+                # A failed key is loaded again by the next load(), instead of its rejection being cached.
+                if self._promises.get(key) is promise:
+                    del self._promises[key]
+                _reraise(reason)
+
+            picked = batch.promise.then(pick).catch(evict)
+            # Its rejection is adopted by this Promise, and is not to be reported on its own.
+            picked._add_resolver(self.promise_class._observe)
+            yield from resolve(picked)
+
+        promise = self._promises[key] = self.promise_class(executor, named='BatchLoader.load')
+        if self._async:
+            # Started so that every caller that gets this Promise for a duplicate key joins the same task.
+            promise.start()
+        return promise
+
+    def load_many(self, keys) -> Promise:
+        """Return a Promise that fulfills with a `list` of the values of `keys`, see `Promise.all`."""
+        keys = list(keys)
+        unique = list(dict.fromkeys(keys))
+
+        def by_key(values):
+            values = dict(zip(unique, values))
+            return [values[key] for key in keys]
+
+        return self.promise_class.all(*[self.load(key) for key in unique]).then(by_key)
+
+    def prime(self, key: Hashable, value: Any):
+        """Cache `value` as the value of `key`, if it is not cached already."""
+        if self.cache:
+            self._promises.setdefault(key, self.promise_class._settled(FULFILLED, value, named='BatchLoader.prime'))
+
+    def clear(self, key: Optional[Hashable] = None):
+        """Forget the cached Promise for `key`, or for all keys if `key` is not given."""
+        if key is None:
+            self._promises.clear()
+        else:
+            self._promises.pop(key, None)
+
+    def flush(self):
+        """Dispatch all batches that have not been dispatched yet."""
+        self._batch = None
+        for batch in self._queued[:]:
+            self._dispatch(batch)
+
+    def _open_batch(self) -> _Batch:
+        if not self._async:
+            batch = _Batch()
+        else:
+            loop = asyncio.get_event_loop()
+            batch = _Batch(loop.create_future())
+            loop.call_soon(self._dispatch, batch)
+        self._queued.append(batch)
+        return batch
+
+    def _dispatch(self, batch: _Batch):
+        if batch.promise is not None:
+            return
+        if batch is self._batch:
+            self._batch = None
+        self._queued.remove(batch)
+        if not self.cache:
+            for key in batch.keys:
+                self._promises.pop(key, None)
+        self.batches += 1
+
+        def executor(resolve, reject):
+            values = self.batch_fn(list(batch.keys))
+            if self._async and isawaitable(values) and not isinstance(values, Promise):
+                values = yield values
+            yield from resolve(values)
+
+        batch.promise = self.promise_class(executor, named='BatchLoader.batch_fn')
+        # A failure of batch_fn is reported through the Promises returned by load().
+        batch.promise._add_resolver(self.promise_class._observe)
+        if not self._async:
+            self.promise_class.settle(batch.promise)
+        else:
+            batch.promise.start()
+            if not batch.ready.done():
+                batch.ready.set_result(None)
+
+
+class _Writes:
+    __slots__ = ('items', 'future', 'timer')
+
+    def __init__(self, future):
+        self.items = []
+        self.future: asyncio.Future = future
+        self.timer = None
+
+
+def _retrieve(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
+
+
+class WriteBehind:
+    """Buffer writes and pass them to a sink in bulk, returning a Promise for each write right away.
+
+    `write(item)` adds `item` to the current batch and returns a `notcallback.async_.Promise`. A batch is flushed by
+    calling `sink(items)` once it has `max_batch` items, or `max_delay` seconds after its first item was written,
+    whichever comes first. `sink` may return a value, a Promise, or an awaitable. The Promises of the writes in a batch
+    fulfill with what `sink` returns once it completes, or reject with the same error if it fails.
+
+    At most `max_flushes` batches are flushed at the same time; further batches wait their turn. Writing never
+    blocks, so to apply backpressure, `await drain()` after writing, which waits while `max_buffer` or more items are
+    written but not yet flushed. `await close()` flushes what is left and waits for all flushes to complete.
+
+    Usage::
+
+        writer = WriteBehind(update_rows_and_commit, max_batch=500, max_delay=0.1)
+        ...
+        promise = writer.write(row)
+        await writer.drain()
+    """
+
+    def __init__(
+        self, sink: Callable[[List], Any], promise_class: Type[AsyncPromise] = AsyncPromise, *, max_batch: int = 100,
+        max_delay: float = .05, max_flushes: int = 1, max_buffer: Optional[int] = None,
+    ):
+        if max_batch < 1:
+            raise ValueError('max_batch must be at least 1')
+        if max_flushes < 1:
+            raise ValueError('max_flushes must be at least 1')
+        if not issubclass(promise_class, AsyncPromise):
+            raise ValueError('WriteBehind requires notcallback.async_.Promise')
+        self.sink = sink
+        self.promise_class = promise_class
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_flushes = max_flushes
+        self.max_buffer = max_buffer if max_buffer is not None else max_batch * (max_flushes + 1)
+        self._batch: Optional[_Writes] = None
+        self._ready = deque()
+        self._flushes = set()
+        self._buffered = 0
+        self._waiters = []
+        self.flushed = 0
+
+    @property
+    def buffered(self) -> int:
+        """Return the number of items written but not yet flushed."""
+        return self._buffered
+
+    @property
+    def flushing(self) -> int:
+        """Return the number of batches being flushed."""
+        return len(self._flushes)
+
+    def write(self, item: Any) -> AsyncPromise:
+        """Add `item` to the current batch, and return a Promise that settles when the batch is flushed."""
+        batch = self._batch
+        if batch is None:
+            loop = asyncio.get_event_loop()
+            batch = self._batch = _Writes(loop.create_future())
+            batch.future.add_done_callback(_retrieve)
+            batch.timer = timers_for(loop).call_later(self.max_delay, partial(self._close, batch))
+        batch.items.append(item)
+        self._buffered += 1
+        if len(batch.items) >= self.max_batch:
+            self._close(batch)
+        future = batch.future
+
+        def executor(resolve, reject):
+            result = yield asyncio.shield(future)
+            yield from resolve(result)
+
+        return self.promise_class(executor, named='WriteBehind.write')
+
+    def flush(self):
+        """Flush the current batch without waiting for it to fill up."""
+        if self._batch is not None:
+            self._close(self._batch)
+
+    async def drain(self):
+        """Wait until fewer than `max_buffer` items are waiting to be flushed."""
+        await self._wait_until(lambda: self._buffered < self.max_buffer)
+
+    async def close(self):
+        """Flush the current batch and wait until every batch is flushed."""
+        self.flush()
+        await self._wait_until(lambda: not self._buffered)
+
+    async def _wait_until(self, predicate):
+        while not predicate():
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def _close(self, batch: _Writes):
+        if batch is not self._batch:
+            return
+        self._batch = None
+        batch.timer.cancel()
+        self._ready.append(batch)
+        self._launch()
+
+    def _launch(self):
+        while self._ready and len(self._flushes) < self.max_flushes:
+            task = asyncio.ensure_future(self._flush(self._ready.popleft()))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: _Writes):
+        try:
+            result = await self.promise_class._promisify(self.sink(batch.items))
+        except Exception as e:
+            batch.future.set_exception(e)
+        else:
+            batch.future.set_result(result)
+        finally:
+            if not batch.future.done():
+                batch.future.cancel()
+            self.flushed += 1
+            self._buffered -= len(batch.items)
+            waiters, self._waiters = self._waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+            # This task still counts as flushing until it is done, so make room for the next batch here.
+            self._flushes.discard(asyncio.current_task())
+            self._launch()
@@ -0,0 +1,335 @@
+# MIT License
+#
+# Copyright (c) 2020 Tony Wu <tony[dot]wu(at)nyu[dot]edu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Caches that share Promises between callers, instead of re-running the same work."""
+
+import pickle
+import sqlite3
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from .async_ import Promise as AsyncPromise
+from .base import FULFILLED, REJECTED, PromiseState
+from .promise import Promise
+
+try:
+    from typing import Callable, Dict, Hashable, Optional, Type
+except ImportError:
+    pass
+
+
+class CacheInfo:
+    """Counters of a `PromiseCache`."""
+
+    __slots__ = ('hits', 'misses', 'coalesced', 'maxsize', 'currsize')
+
+    def __init__(self, hits, misses, coalesced, maxsize, currsize):
+        self.hits = hits
+        self.misses = misses
+        self.coalesced = coalesced
+        self.maxsize = maxsize
+        self.currsize = currsize
+
+    def __repr__(self):
+        return 'CacheInfo(hits=%d, misses=%d, coalesced=%d, maxsize=%r, currsize=%d)' % (
+            self.hits, self.misses, self.coalesced, self.maxsize, self.currsize,
+        )
+
+
+def _make_key(*args, **kwargs) -> Hashable:
+    """Return a hashable key for a call with these arguments."""
+    if not kwargs:
+        return args
+    return args + (_make_key,) + tuple(sorted(kwargs.items()))
+
+
+class PromiseCache:
+    """A cache of Promises by key, with single-flight calls, LRU and TTL eviction.
+
+    Calls for a key that is not cached call the function once and share its Promise with every caller that asks for
+    the same key until it settles (single-flight). `notcallback.async_.Promise`s are started right away so that all
+    callers join the same task.
+
+    Once settled, fulfilled Promises are kept for `ttl` seconds (forever if `None`), rejected ones for `negative_ttl`
+    seconds (not at all if 0), and at most `maxsize` of them are kept, evicting the least recently used first.
+
+    Parameters
+    ----------
+    promise_class : type
+        The Promise class functions called through the cache return.
+    maxsize : int, optional
+        How many settled Promises to keep. `None` for no limit.
+    ttl : float, optional
+        How long to keep fulfilled Promises, in seconds of `clock`.
+    negative_ttl : float
+        How long to keep rejected Promises, in seconds of `clock`.
+    clock : Callable[[], float]
+        The clock used for expiry.
+    """
+
+    def __init__(
+        self, promise_class: Type[Promise] = Promise, *, maxsize: Optional[int] = 128, ttl: Optional[float] = None,
+        negative_ttl: float = 0, clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+        self.promise_class = promise_class
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._settled = OrderedDict()
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._settled)
+
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def info(self) -> CacheInfo:
+        """Return the hit, miss, and coalesced counters and the size of the cache."""
+        return CacheInfo(self.hits, self.misses, self.coalesced, self.maxsize, len(self))
+
+    def clear(self):
+        """Forget all settled Promises. Promises in flight are still shared until they settle."""
+        self._settled.clear()
+
+    def invalidate(self, key: Hashable):
+        """Forget the Promise for `key`, settled or in flight."""
+        self._settled.pop(key, None)
+        self._in_flight.pop(key, None)
+
+    def _lookup(self, key) -> Optional[Promise]:
+        entry = self._settled.get(key)
+        if entry is None:
+            return None
+        expires, promise = entry
+        if expires is not None and self.clock() >= expires:
+            del self._settled[key]
+            return None
+        self._settled.move_to_end(key)
+        return promise
+
+    def _ttl(self, state) -> Optional[float]:
+        return self.ttl if state is FULFILLED else self.negative_ttl
+
+    def _store(self, key, promise, state, value):
+        ttl = self._ttl(state)
+        if ttl is not None and ttl <= 0:
+            return
+        self._settled[key] = (None if ttl is None else self.clock() + ttl, promise)
+        self._settled.move_to_end(key)
+        if self.maxsize is not None and len(self._settled) > self.maxsize:
+            self._settled.popitem(last=False)
+
+    def get(self, key: Hashable, factory: Callable[..., Promise], *args, **kwargs) -> Promise:
+        """Return the Promise cached or in flight for `key`, or else call `factory(*args, **kwargs)` for it."""
+        promise = self._lookup(key)
+        if promise is not None:
+            self.hits += 1
+            return promise
+        promise = self._in_flight.get(key)
+        if promise is not None:
+            self.coalesced += 1
+            return promise
+        self.misses += 1
+        try:
+            promise = factory(*args, **kwargs)
+        except (GeneratorExit, KeyboardInterrupt, SystemExit):
+            raise
+        except BaseException as e:
+            return self.promise_class._settled(REJECTED, e, named='PromiseCache')
+        if not isinstance(promise, self.promise_class):
+            raise TypeError('%s is not an instance of %s' % (repr(promise), repr(self.promise_class)))
+
+        def settled():
+            if self._in_flight.get(key) is shared:
+                del self._in_flight[key]
+                self._store(key, shared, promise._state, promise._value)
+
+        shared = promise.finally_(settled)
+        self._in_flight[key] = shared
+        if isinstance(shared, AsyncPromise):
+            shared.start()
+        return shared
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self.info())
+
+
+def memoize_promise(
+    func: Optional[Callable[..., Promise]] = None, *, key: Callable[..., Hashable] = _make_key, **options,
+):
+    """Decorate a function returning Promises to cache them with a `PromiseCache`.
+
+    Keyword arguments other than `key` are passed to `PromiseCache`. `key` turns the arguments of a call into the
+    cache key, by default all positional and keyword arguments, which must then be hashable. The cache is available
+    as the `cache` attribute of the decorated function.
+
+    Usage::
+
+        @memoize_promise(promise_class=notcallback.async_.Promise, maxsize=1024, ttl=60, negative_ttl=5)
+        def fetch_user(user_id):
+            ...
+    """
+    if func is None:
+        return lambda f: memoize_promise(f, key=key, **options)
+    cache = PromiseCache(**options)
+
+    @wraps(func)
+    def wrapped(*args, **kwargs):
+        return cache.get(key(*args, **kwargs), func, *args, **kwargs)
+
+    wrapped.cache = cache
+    return wrapped
+
+
+class PersistentCache(PromiseCache):
+    """A `PromiseCache` that keeps settled Promises in an SQLite database, so that they outlive the process.
+
+    Keys are strings. The states and values of settled Promises are written with `serializer` (anything with `dumps`
+    and `loads`, such as `pickle` or `json`) and read back as already settled Promises, without running anything.
+    Values that `serializer` cannot write are simply not cached.
+
+    Writes are buffered and committed `batch_size` at a time in a single transaction, and on `flush()` and `close()`,
+    so that misses do not each pay for a commit. At most `max_entries` Promises are kept, evicting the oldest first.
+    Expiry uses wall-clock time by default, since entries are read back by later processes.
+
+    Parameters
+    ----------
+    path : str
+        Path of the database file, or `':memory:'`.
+    promise_class : type
+        The Promise class functions called through the cache return, and that hits are returned as.
+    serializer : object
+        An object with `dumps(value) -> bytes | str` and `loads(data) -> value` methods.
+    max_entries : int, optional
+        How many settled Promises to keep. `None` for no limit.
+    ttl : float, optional
+        How long to keep fulfilled Promises, in seconds of `clock`.
+    negative_ttl : float
+        How long to keep rejected Promises, in seconds of `clock`.
+    batch_size : int
+        How many writes to buffer before committing them.
+    clock : Callable[[], float]
+        The clock used for expiry.
+    """
+
+    def __init__(
+        self, path: str, promise_class: Type[Promise] = Promise, *, serializer=pickle,
+        max_entries: Optional[int] = None, ttl: Optional[float] = None, negative_ttl: float = 0,
+        batch_size: int = 100, clock: Callable[[], float] = time.time,
+    ):
+        super().__init__(promise_class, maxsize=max_entries, ttl=ttl, negative_ttl=negative_ttl, clock=clock)
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        self.serializer = serializer
+        self.batch_size = batch_size
+        self._pending: Dict[str, tuple] = {}
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS promises '
+            '(key TEXT PRIMARY KEY, state TEXT NOT NULL, value BLOB, expires REAL, created REAL NOT NULL)',
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS promises_created ON promises (created)')
+        self._db.commit()
+
+    def __len__(self):
+        self.flush()
+        return self._db.execute('SELECT COUNT(*) FROM promises').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _lookup(self, key) -> Optional[Promise]:
+        if not isinstance(key, str):
+            raise TypeError('PersistentCache keys must be strings, not %s' % type(key).__name__)
+        row = self._pending.get(key)
+        if row is None:
+            row = self._db.execute('SELECT state, value, expires FROM promises WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+        state, data, expires = row[:3]
+        if expires is not None and self.clock() >= expires:
+            # Expired rows are deleted by the next flush(), with the writes, instead of in a transaction of their own.
+            self._pending.pop(key, None)
+            return None
+        return self.promise_class._settled(
+            PromiseState(state), self.serializer.loads(data), named='PersistentCache',
+        )
+
+    def _store(self, key, promise, state, value):
+        ttl = self._ttl(state)
+        if ttl is not None and ttl <= 0:
+            return
+        try:
+            data = self.serializer.dumps(value)
+        except Exception:
+            return
+        now = self.clock()
+        self._pending[key] = (state.value, data, None if ttl is None else now + ttl, now)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Commit buffered writes, and evict expired and excess entries, in one transaction."""
+        if not self._pending:
+            return
+        rows = [(key, *row) for key, row in self._pending.items()]
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO promises VALUES (?, ?, ?, ?, ?)', rows)
+            self._db.execute('DELETE FROM promises WHERE expires <= ?', (self.clock(),))
+            if self.maxsize is not None:
+                self._db.execute(
+                    'DELETE FROM promises WHERE key IN '
+                    '(SELECT key FROM promises ORDER BY created DESC LIMIT -1 OFFSET ?)', (self.maxsize,),
+                )
+        self._pending.clear()
+
+    def clear(self):
+        """Delete all settled Promises. Promises in flight are still shared until they settle."""
+        self._pending.clear()
+        with self._db:
+            self._db.execute('DELETE FROM promises')
+
+    def invalidate(self, key: str):
+        """Delete the Promise for `key`, settled or in flight."""
+        super().invalidate(key)
+        self._delete(key)
+
+    def _delete(self, key):
+        self._pending.pop(key, None)
+        with self._db:
+            self._db.execute('DELETE FROM promises WHERE key = ?', (key,))
+
+    def close(self):
+        """Commit buffered writes and close the database."""
+        self.flush()
+        self._db.close()
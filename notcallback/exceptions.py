@@ -41,14 +41,79 @@ class PromiseAggregateError(RuntimeError):
     """PromiseAggregateError.
 
     Raised when the result of a Promise aggregation does not meet the requirements
-    of the aggregation strategy, currently only used in `Promise.any`.
+    of the aggregation strategy, used in `Promise.any` and `Promise.some`.
     """
 
     def __str__(self):
         """Print PromiseAggregateError."""
+        if self.args:
+            return self.__class__.__name__ + ': ' + str(self.args[0])
         return self.__class__.__name__ + ': No Promise in Promise.any was resolved.'
 
 
+class PromiseTimeout(TimeoutError):
+    """Rejection reason of a Promise that did not settle before its deadline.
+
+    This is an ordinary rejection and can be handled with `catch()`; it deliberately does not derive
+    from `PromiseException`.
+    """
+
+    def __init__(self, promise=None, deadline=None):
+        """Create a timeout for `promise`, which had to settle before `deadline`."""
+        super().__init__('Promise did not settle before its deadline.')
+        self.promise = promise
+        self.deadline = deadline
+
+
+class PromiseCancelled(Exception):
+    """Rejection reason of a Promise that was cancelled with `Promise.cancel()`.
+
+    Promises rejected with it are "cancelled": handlers chained to them with `then()` and `catch()` are skipped, and
+    no `UnhandledPromiseRejectionWarning` is issued for them. Like `PromiseTimeout`, it does not derive from
+    `PromiseException`.
+    """
+
+    def __init__(self, promise=None, reason=None):
+        """Create the cancellation of `promise`, with an optional `reason`."""
+        super().__init__('Promise was cancelled.' if reason is None else 'Promise was cancelled: %s' % (reason,))
+        self.promise = promise
+        self.reason = reason
+
+
+class CircuitOpenError(RuntimeError):
+    """Rejection reason of a call that was not made because its circuit breaker is open.
+
+    Like `PromiseTimeout`, this is an ordinary rejection and does not derive from `PromiseException`.
+    """
+
+    def __init__(self, breaker=None):
+        """Create the rejection reason for a call refused by `breaker`."""
+        super().__init__('Circuit breaker is open.')
+        self.breaker = breaker
+
+
+class AdmissionRejected(RuntimeError):
+    """Rejection reason of a call that was shed by an admission controller because too many Promises are pending.
+
+    Like `PromiseTimeout`, this is an ordinary rejection and does not derive from `PromiseException`.
+    """
+
+    def __init__(self, controller=None, tag=None):
+        """Create the rejection reason for a call with `tag` shed by `controller`."""
+        super().__init__('Too many pending Promises.' if tag is None else 'Too many pending Promises for %r.' % (tag,))
+        self.controller = controller
+        self.tag = tag
+
+
+class PoolExhausted(RuntimeError):
+    """Rejection reason of a synchronous `Pool.acquire()` when every resource is in use and none can be created."""
+
+    def __init__(self, pool=None):
+        """Create the rejection reason for `pool`."""
+        super().__init__('All %d resources are in use.' % pool.max_size if pool is not None else 'Pool exhausted.')
+        self.pool = pool
+
+
 class StopEarly(GeneratorExit):
     """Signal an early exit of a promise aggregation, cancelling Promises that have not been evaluated."""
 
@@ -0,0 +1,513 @@
+# MIT License
+#
+# Copyright (c) 2020 Tony Wu <tony[dot]wu(at)nyu[dot]edu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""Limits on how many asyncio Promises run at the same time, and how often they start.
+
+A limiter is any object with the following methods:
+
+- `await limiter.acquire(promise)`, which waits until `promise` may start and returns a permit;
+- `limiter.release(permit, rejected=False)`, which is called once the Promise has settled.
+
+`notcallback.async_.Promise.all()` and the other aggregation methods accept a limiter via the `limiter` keyword
+argument when run with `concurrently=True`. Limiters can also be used on their own with `await limiter.run(promise)`.
+
+The limiters in this module derive from `Limiter`, which provides `run()` on top of `acquire()` and `release()`.
+"""
+
+import asyncio
+import heapq
+from collections import deque
+from itertools import count
+
+try:
+    from typing import Any, Callable, Deque, Dict, Optional
+except ImportError:
+    pass
+
+
+class _Permit:
+    """Proof that a Promise was allowed to start by a limiter."""
+
+    __slots__ = ('key', 'start')
+
+    def __init__(self, key=None, start=0.0):
+        self.key = key
+        self.start = start
+
+
+class Limiter:
+    """Base class for limiters."""
+
+    def _loop(self):
+        return asyncio.get_event_loop()
+
+    async def acquire(self, promise=None) -> _Permit:
+        """Wait until a Promise may start, and return a permit to be passed to `release()` once it has settled."""
+        raise NotImplementedError
+
+    def release(self, permit: _Permit, rejected=False):
+        """Give back the permit of a Promise once it has settled."""
+        raise NotImplementedError
+
+    async def run(self, promise, **kwargs) -> Any:
+        """Wait until the Promise may start, then `await` the Promise (or any other awaitable) and return its value.
+
+        Keyword arguments are passed to `acquire()`. If the Promise rejects, the reason is raised, and counts as
+        a rejection.
+        """
+        permit = await self.acquire(promise, **kwargs)
+        try:
+            value = await promise
+        except asyncio.CancelledError:
+            self.release(permit)
+            raise
+        except BaseException:
+            self.release(permit, rejected=True)
+            raise
+        self.release(permit)
+        return value
+
+
+class ConcurrencyLimiter(Limiter):
+    """Allow at most `limit` Promises to run at the same time.
+
+    Promises that cannot start immediately wait in a FIFO queue.
+    """
+
+    def __init__(self, limit: int):
+        """Create a limiter that lets at most `limit` Promises run at the same time."""
+        if limit < 1:
+            raise ValueError('limit must be at least 1')
+        self._limit = limit
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        """Return the number of Promises that may run at the same time."""
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of Promises that are currently running."""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of Promises that are waiting to start."""
+        return len(self._waiters)
+
+    async def acquire(self, promise=None) -> _Permit:
+        loop = self._loop()
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return _Permit(start=loop.time())
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation; give it back.
+                self._in_flight -= 1
+                self._wake_up()
+            elif waiter in self._waiters:
+                # Unless _wake_up() already discarded it.
+                self._waiters.remove(waiter)
+            raise
+        return _Permit(start=loop.time())
+
+    def release(self, permit: _Permit, rejected=False):
+        self._in_flight -= 1
+        self._update(permit, rejected)
+        self._wake_up()
+
+    def _update(self, permit: _Permit, rejected: bool):
+        """Update the limit based on the outcome of a Promise. Does nothing by default."""
+        pass
+
+    def _wake_up(self):
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+
+class AdaptiveLimiter(ConcurrencyLimiter):
+    """A `ConcurrencyLimiter` whose limit follows the health of the Promises it runs (AIMD).
+
+    - Each Promise that fulfills in time increases the limit additively, by about `increase` per `limit` Promises,
+    as long as the limiter is actually being used at more than half its limit;
+    - A rejection, or a settle latency above `latency_threshold` (in seconds), multiplies the limit by `backoff`.
+    Only Promises that started after the last decrease can cause another decrease, so that a burst of failures
+    from the same batch does not collapse the limit all at once.
+
+    The limit always stays between `min_limit` and `max_limit`.
+
+    For monitoring, `limit`, `in_flight`, and `queue_depth` report the current state, and `latency` and
+    `rejection_rate` report exponentially weighted moving averages of the observed settle latencies and rejections.
+    """
+
+    def __init__(
+        self, initial: int = 10, *, min_limit: int = 1, max_limit: int = 1000,
+        increase: float = 1.0, backoff: float = 0.5, latency_threshold: Optional[float] = None, smoothing: float = 0.1,
+    ):
+        """Create an adaptive limiter starting at `initial`."""
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError('limits must satisfy 1 <= min_limit <= initial <= max_limit')
+        if not 0 < backoff < 1:
+            raise ValueError('backoff must be between 0 and 1')
+        super().__init__(initial)
+        self._estimate = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_threshold = latency_threshold
+        self.smoothing = smoothing
+        self.latency: Optional[float] = None
+        self.rejection_rate = 0.0
+        self._last_decrease = float('-inf')
+
+    @property
+    def limit(self) -> int:
+        """Return the current limit."""
+        return int(self._estimate)
+
+    def _update(self, permit: _Permit, rejected: bool):
+        now = self._loop().time()
+        latency = now - permit.start
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        self.rejection_rate += self.smoothing * (float(rejected) - self.rejection_rate)
+
+        too_slow = self.latency_threshold is not None and latency > self.latency_threshold
+        if rejected or too_slow:
+            if permit.start >= self._last_decrease:
+                self._estimate = max(self.min_limit, self._estimate * self.backoff)
+                self._last_decrease = now
+        elif (self._in_flight + 1) * 2 >= self.limit:
+            self._estimate = min(self.max_limit, self._estimate + self.increase / self._estimate)
+
+
+class KeyStats:
+    """Statistics of one key of a `Bulkhead`."""
+
+    __slots__ = ('in_flight', 'queue_length', 'acquired', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.in_flight = 0
+        self.queue_length = 0
+        self.acquired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """Return the average time, in seconds, that Promises of this key waited before starting."""
+        return self.total_wait / self.acquired if self.acquired else 0.0
+
+    def __repr__(self):
+        return '<%s in_flight=%d queue_length=%d mean_wait=%.6f max_wait=%.6f>' % (
+            self.__class__.__name__, self.in_flight, self.queue_length, self.mean_wait, self.max_wait,
+        )
+
+
+class Bulkhead(Limiter):
+    """Give each key (such as a host, a tenant, or a table) its own concurrency pool and queue.
+
+    Each key allows at most `per_key` Promises to run at the same time (or the value for that key in `limits`),
+    so that a slow key that fills up its own pool does not take slots away from the other keys. If `total` is
+    given, it caps the number of Promises running across all keys, and Promises that already hold a slot of
+    their key wait in a shared FIFO queue for it.
+
+    The key of a Promise is given to `acquire()`/`run()` with the `key` keyword argument, or computed by calling
+    `key(promise)` if a `key` function is given (for example when the Bulkhead is used as the `limiter` of
+    `Promise.all()`).
+    """
+
+    def __init__(self, per_key: int, *, total: Optional[int] = None, limits: Optional[dict] = None, key=None):
+        """Create a Bulkhead with `per_key` slots for each key."""
+        if per_key < 1:
+            raise ValueError('per_key must be at least 1')
+        self.per_key = per_key
+        self.limits = dict(limits or {})
+        self.key = key
+        self._pools = {}
+        self._stats = {}
+        self._total = ConcurrencyLimiter(total) if total is not None else None
+
+    def _pool(self, key) -> ConcurrencyLimiter:
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = ConcurrencyLimiter(self.limits.get(key, self.per_key))
+            self._stats[key] = KeyStats()
+        return pool
+
+    def stats(self, key=None):
+        """Return the `KeyStats` of `key`, or a dict of the `KeyStats` of all keys if `key` is not given."""
+        for k, pool in self._pools.items():
+            stats = self._stats[k]
+            stats.in_flight = pool.in_flight
+            stats.queue_length = pool.queue_depth
+        if key is not None:
+            self._pool(key)
+            return self._stats[key]
+        return dict(self._stats)
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of Promises that are currently running, across all keys."""
+        return sum(pool.in_flight for pool in self._pools.values())
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of Promises that are waiting to start, across all keys."""
+        waiting = sum(pool.queue_depth for pool in self._pools.values())
+        if self._total is not None:
+            waiting += self._total.queue_depth
+        return waiting
+
+    async def acquire(self, promise=None, *, key=None) -> _Permit:
+        if key is None and self.key is not None:
+            key = self.key(promise)
+        pool = self._pool(key)
+        start = self._loop().time()
+        await pool.acquire()
+        if self._total is not None:
+            try:
+                await self._total.acquire()
+            except asyncio.CancelledError:
+                pool.release(None)
+                raise
+        now = self._loop().time()
+        stats = self._stats[key]
+        stats.acquired += 1
+        stats.total_wait += now - start
+        stats.max_wait = max(stats.max_wait, now - start)
+        return _Permit(key, now)
+
+    def release(self, permit: _Permit, rejected=False):
+        self._pools[permit.key].release(permit, rejected)
+        if self._total is not None:
+            self._total.release(permit, rejected)
+
+
+class Scheduler(ConcurrencyLimiter):
+    """A `ConcurrencyLimiter` that starts waiting Promises by priority, deadline, and fair share instead of FIFO.
+
+    When a slot frees up, the waiting Promise that starts next is chosen by, in order:
+
+    1. `priority`: lower values start first (like `heapq` and `asyncio.PriorityQueue`), by default 0;
+    2. `deadline`: among Promises of the same priority, the one with the earliest deadline starts first
+    (earliest-deadline-first), and Promises without a deadline come after those with one. Deadlines are
+    absolute times on the event loop clock (`loop.time()`);
+    3. `tenant`: the remaining Promises are shared between tenants by weighted fair queueing, so that a tenant
+    with weight 2 gets about twice as many slots as a tenant with weight 1 while both have Promises waiting,
+    however many Promises each of them queued. Weights are given by `weights`, by default 1 for every tenant;
+    4. arrival order.
+
+    The hints of a Promise are given to `acquire()`/`run()` as keyword arguments, or computed by calling the
+    `priority`, `tenant`, and `deadline` functions with the Promise (for example when the Scheduler is used as the
+    `limiter` of `Promise.all()` or `Promise.map()`).
+    """
+
+    def __init__(
+        self, limit: int, *, priority: Optional[Callable] = None, tenant: Optional[Callable] = None,
+        deadline: Optional[Callable] = None, weights: Optional[Dict[Any, float]] = None,
+    ):
+        """Create a Scheduler that lets at most `limit` Promises run at the same time."""
+        super().__init__(limit)
+        self.priority = priority
+        self.tenant = tenant
+        self.deadline = deadline
+        self.weights = dict(weights or {})
+        self._waiters = []
+        self._queued = 0
+        self._seq = count()
+        self._virtual_time = 0.0
+        self._finish: Dict[Any, float] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of Promises that are waiting to start."""
+        return self._queued
+
+    def _hint(self, extractor, promise, value, default):
+        if value is None and extractor is not None:
+            value = extractor(promise)
+        return default if value is None else value
+
+    async def acquire(self, promise=None, *, priority=None, tenant=None, deadline=None) -> _Permit:
+        loop = self._loop()
+        if self._in_flight < self.limit and not self._queued:
+            self._in_flight += 1
+            return _Permit(start=loop.time())
+
+        priority = self._hint(self.priority, promise, priority, 0)
+        tenant = self._hint(self.tenant, promise, tenant, None)
+        deadline = self._hint(self.deadline, promise, deadline, float('inf'))
+        start_tag = max(self._virtual_time, self._finish.get(tenant, 0.0))
+        finish_tag = start_tag + 1.0 / self.weights.get(tenant, 1.0)
+        self._finish[tenant] = finish_tag
+
+        waiter = loop.create_future()
+        heapq.heappush(self._waiters, (priority, deadline, finish_tag, next(self._seq), start_tag, waiter))
+        self._queued += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation; give it back.
+                self._in_flight -= 1
+                self._wake_up()
+            else:
+                # The entry stays in the heap and is skipped once it reaches the top.
+                self._queued -= 1
+                waiter.cancel()
+            raise
+        return _Permit(start=loop.time())
+
+    def _wake_up(self):
+        while self._waiters and self._in_flight < self.limit:
+            entry = heapq.heappop(self._waiters)
+            waiter = entry[-1]
+            if waiter.done():
+                continue
+            self._queued -= 1
+            self._in_flight += 1
+            self._virtual_time = entry[-2]
+            waiter.set_result(None)
+        if not self._waiters:
+            # Nobody is waiting, so past service no longer matters for fairness.
+            self._virtual_time = 0.0
+            self._finish.clear()
+
+
+class RateLimiter(Limiter):
+    """Let Promises start at no more than `rate` per second on average, with bursts of up to `burst` (token bucket).
+
+    The bucket holds up to `burst` tokens (by default `max(1, rate)`) and refills at `rate` tokens per second.
+    Each Promise takes `cost` tokens (by default 1) when it starts, and waits in a FIFO queue if there are not
+    enough of them. The queue is served by a single timer scheduled for when the first waiting Promise has enough
+    tokens, so that thousands of waiting Promises cost no more than one.
+
+    Settling does not give tokens back: `release()` does nothing, and the number of Promises running at the same
+    time is not limited. Wrap the Promises with a `ConcurrencyLimiter` as well to also limit that.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """Create a RateLimiter letting `rate` Promises start per second, starting with a full bucket."""
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        burst = max(1.0, rate) if burst is None else burst
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = None
+        self._queued = 0
+        self._waiters: Deque = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def tokens(self) -> float:
+        """Return the number of tokens currently in the bucket."""
+        self._refill(self._loop().time())
+        return self._tokens
+
+    @property
+    def queue_depth(self) -> int:
+        """Return the number of Promises that are waiting to start."""
+        return self._queued
+
+    def _refill(self, now: float):
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, promise=None, *, cost: float = 1) -> _Permit:
+        if cost > self.burst:
+            raise ValueError('cost cannot be larger than burst')
+        loop = self._loop()
+        now = loop.time()
+        self._refill(now)
+        if not self._queued and self._tokens >= cost:
+            self._tokens -= cost
+            return _Permit(start=now)
+        waiter = loop.create_future()
+        self._waiters.append((waiter, cost))
+        self._queued += 1
+        self._schedule(loop)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The tokens were taken just before cancellation; put them back.
+                self._tokens = min(self.burst, self._tokens + cost)
+                self._drain()
+            else:
+                # The entry stays in the queue and is skipped once it reaches the front.
+                self._queued -= 1
+                waiter.cancel()
+                if self._waiters and self._waiters[0][0] is waiter:
+                    # The timer was set for this waiter; the next one may need fewer tokens.
+                    self._drain()
+            raise
+        return _Permit(start=loop.time())
+
+    def release(self, permit: _Permit, rejected=False):
+        pass
+
+    def _schedule(self, loop):
+        if self._timer is not None or not self._queued:
+            return
+        # Cancelled waiters are only counted out of _queued once their task resumes, so they may all be gone.
+        while self._waiters and self._waiters[0][0].done():
+            self._waiters.popleft()
+        if not self._waiters:
+            return
+        _, cost = self._waiters[0]
+        self._timer = loop.call_at(self._updated + (cost - self._tokens) / self.rate, self._drain)
+
+    def _drain(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        loop = self._loop()
+        self._refill(loop.time())
+        while self._waiters:
+            waiter, cost = self._waiters[0]
+            if waiter.done():
+                self._waiters.popleft()
+                continue
+            if self._tokens < cost:
+                break
+            self._waiters.popleft()
+            self._queued -= 1
+            self._tokens -= cost
+            waiter.set_result(None)
+        self._schedule(loop)
@@ -0,0 +1,265 @@
+# MIT License
+#
+# Copyright (c) 2020 Tony Wu <tony[dot]wu(at)nyu[dot]edu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""A pool of reusable resources, such as connections, handed out through Promises."""
+
+import asyncio
+import time
+from collections import deque
+
+from .async_ import Promise as AsyncPromise
+from .base import REJECTED
+from .exceptions import PoolExhausted
+from .promise import Promise, _reraise
+
+try:
+    from typing import Any, Callable, Deque, Optional, Tuple, Type
+except ImportError:
+    pass
+
+_CREATE = object()
+
+
+class Pool:
+    """A bounded pool of resources, created with `create()` and handed out by `acquire()`.
+
+    `acquire()` returns a Promise of a resource: an idle one if there is one that passes `check(resource)`, or else
+    a new one from `create()` if fewer than `max_size` exist. Otherwise, with `notcallback.async_.Promise`, the
+    Promise waits for a resource to be released, first come first served; with the synchronous Promise, which
+    cannot wait, it rejects with `PoolExhausted`. Resources must be given back with `release()`, or with `discard()`
+    if they are broken; `use(handler)` does that in a `finally_()` handler.
+
+    Resources that have been idle for `max_idle` seconds are destroyed (with `destroy(resource)`), except for the
+    `min_size` that `warm_up()` creates ahead of time.
+
+    Parameters
+    ----------
+    create : Callable[[], Any]
+        A function returning a new resource, or a Promise of one (or with `notcallback.async_.Promise`, an awaitable).
+    promise_class : type
+        The Promise class to return.
+    max_size : int
+        The most resources that may exist at the same time, idle or in use.
+    min_size : int
+        How many resources `warm_up()` creates, and idle eviction keeps.
+    destroy : Callable[[Any], Any], optional
+        A function that closes a resource that is evicted, discarded, or unhealthy.
+    check : Callable[[Any], bool], optional
+        A function that tells whether an idle resource is still usable before it is handed out.
+    max_idle : float, optional
+        How long, in seconds of `clock`, a resource may stay idle before it is destroyed.
+    clock : Callable[[], float]
+        The clock used for idle eviction.
+    """
+
+    def __init__(
+        self, create: Callable[[], Any], promise_class: Type[Promise] = Promise, *, max_size: int = 10,
+        min_size: int = 0, destroy: Optional[Callable[[Any], Any]] = None,
+        check: Optional[Callable[[Any], bool]] = None, max_idle: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        if not 0 <= min_size <= max_size:
+            raise ValueError('min_size must be between 0 and max_size')
+        self.create = create
+        self.promise_class = promise_class
+        self.max_size = max_size
+        self.min_size = min_size
+        self.destroy = destroy
+        self.check = check
+        self.max_idle = max_idle
+        self.clock = clock
+        self._async = issubclass(promise_class, AsyncPromise)
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._size = 0
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """Return the number of resources that exist or are being created."""
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        """Return the number of idle resources."""
+        return len(self._idle)
+
+    @property
+    def in_use(self) -> int:
+        """Return the number of resources handed out or being created."""
+        return self._size - len(self._idle)
+
+    @property
+    def waiting(self) -> int:
+        """Return the number of `acquire()`s waiting for a resource."""
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def acquire(self) -> Promise:
+        """Return a Promise of a resource, which must be given back with `release()` or `discard()`."""
+        def executor(resolve, reject):
+            if self._closed:
+                raise RuntimeError('Pool is closed')
+            self.evict_idle()
+            resource = self._take_idle()
+            if resource is not _CREATE:
+                return (yield from resolve(resource))
+            if self._size < self.max_size:
+                return (yield from resolve(self._create()))
+            if not self._async:
+                return (yield from reject(PoolExhausted(self)))
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                resource = yield waiter
+            except BaseException:
+                if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                    # A resource was handed over just before the cancellation; give it back.
+                    self._hand_back(waiter.result())
+                else:
+                    waiter.cancel()
+                raise
+            if resource is _CREATE:
+                resource = self._reserved()
+            yield from resolve(resource)
+
+        return self.promise_class(executor, named='Pool.acquire')
+
+    def release(self, resource: Any):
+        """Give back a resource that is still usable."""
+        if self._closed:
+            self._size -= 1
+            self._destroy(resource)
+            return
+        self._idle.append((resource, self.clock()))
+        self._hand_back(_CREATE)
+        self.evict_idle()
+
+    def discard(self, resource: Any):
+        """Give back a resource that is broken, so that it is destroyed instead of reused."""
+        self._size -= 1
+        self._destroy(resource)
+        self._hand_back(_CREATE)
+
+    def use(self, handler: Callable[[Any], Any]) -> Promise:
+        """Return a Promise that acquires a resource, passes it to `handler`, and releases it once that settles."""
+        acquired = []
+
+        def hold(resource):
+            acquired.append(resource)
+            result = handler(resource)
+            return self.promise_class._promisify(result) if self._async else result
+
+        def give_back():
+            if acquired:
+                self.release(acquired.pop())
+
+        return self.acquire().then(hold).finally_(give_back)
+
+    def warm_up(self, count: Optional[int] = None) -> Promise:
+        """Return a Promise that creates resources until there are `count` of them (`min_size` by default)."""
+        missing = min(self.min_size if count is None else count, self.max_size) - self._size
+        if missing <= 0:
+            return self.promise_class.resolve([])
+        return self.promise_class.all(*[self._create().then(self.release) for _ in range(missing)])
+
+    def evict_idle(self):
+        """Destroy the resources that have been idle for longer than `max_idle`, keeping `min_size` of them."""
+        if self.max_idle is None:
+            return
+        expired = self.clock() - self.max_idle
+        while self._idle and self._idle[0][1] <= expired and self._size > self.min_size:
+            resource, _ = self._idle.popleft()
+            self._size -= 1
+            self._destroy(resource)
+
+    def close(self):
+        """Destroy the idle resources, and those released from now on, and stop handing out resources."""
+        self._closed = True
+        while self._idle:
+            self._size -= 1
+            self._destroy(self._idle.popleft()[0])
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(RuntimeError('Pool is closed'))
+
+    def _take_idle(self):
+        while self._idle:
+            resource, _ = self._idle.pop()
+            if self.check is None or self.check(resource):
+                return resource
+            self._size -= 1
+            self._destroy(resource)
+        return _CREATE
+
+    def _hand_back(self, resource):
+        """Pass a resource, or the room to create one, to the first waiter, or else back to the pool."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            if resource is _CREATE:
+                resource = self._take_idle()
+                if resource is _CREATE and self._size >= self.max_size:
+                    self._waiters.appendleft(waiter)
+                    return
+                if resource is _CREATE:
+                    self._size += 1
+            waiter.set_result(resource)
+            return
+        if resource is not _CREATE:
+            self.release(resource)
+
+    def _create(self) -> Promise:
+        self._size += 1
+        return self._reserved()
+
+    def _reserved(self) -> Promise:
+        """Return a Promise of a new resource, for which room in the pool was already made."""
+        try:
+            resource = self.create()
+        except (GeneratorExit, KeyboardInterrupt, SystemExit):
+            raise
+        except BaseException as e:
+            self._size -= 1
+            self._hand_back(_CREATE)
+            return self.promise_class._settled(REJECTED, e, named='Pool.create')
+
+        def failed(reason):
+            self._size -= 1
+            self._hand_back(_CREATE)
+            _reraise(reason)
+
+        if self._async:
+            return self.promise_class._promisify(resource).catch(failed)
+        if isinstance(resource, Promise):
+            return resource.catch(failed)
+        return self.promise_class.resolve(resource)
+
+    def _destroy(self, resource):
+        if self.destroy is not None:
+            self.destroy(resource)
+
+    def __repr__(self):
+        return '<%s size=%d idle=%d waiting=%d>' % (self.__class__.__name__, self._size, self.idle, self.waiting)
@@ -22,20 +22,22 @@
 
 """The Promise class."""
 
+import random
+import time
 import warnings
 from collections import deque
 from inspect import isgenerator
 
 from .base import FULFILLED, PENDING, REJECTED, PromiseState
-from .exceptions import (PromiseAggregateError, PromiseException,
-                         PromisePending, PromiseRejection, PromiseWarning,
-                         UnhandledPromiseRejectionWarning)
+from .exceptions import (PromiseAggregateError, PromiseCancelled,
+                         PromiseException, PromisePending, PromiseRejection,
+                         PromiseWarning, UnhandledPromiseRejectionWarning)
 from .utils import (_CachedGeneratorFunc, as_generator_func,
                     one_line_warning_format)
 
 try:
-    from typing import (Any, Callable, Generator, List, Optional, Tuple, Type,
-                        TypeVar, Union)
+    from typing import (Any, Callable, Generator, Iterator, List, Optional,
+                        Tuple, Type, TypeVar, Union)
     PromiseType = TypeVar('PromiseType', bound='Promise')
     NoReturnCallable = Callable[..., None]
     NoReturnGenerator = Generator[Any, Any, None]
@@ -64,6 +66,84 @@ def _reraise(exc):
     raise PromiseRejection(exc)
 
 
+class _Interruption:
+    """Wrap the executor of a cancelled Promise so that the next step raises the cancellation where it is suspended.
+
+    An executor that has not started yet never runs. One that is suspended sees the cancellation raised at its
+    `yield`, so that its `finally` blocks run; the Promise then rejects with it, unless the executor handles it.
+
+    A Promise that was detached from the Promise it depends on (`source`) stops evaluating it instead: its executor is
+    closed, and what was about to be sent to `source` is passed to `source._hand_over()`.
+    """
+
+    __slots__ = ('promise', 'gen', 'exc', 'source')
+
+    def __init__(self, promise: 'Promise', gen, exc: PromiseCancelled, source: 'Promise' = None):
+        self.promise = promise
+        self.gen = gen
+        self.exc = exc
+        self.source = source
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def _pop(self):
+        exc, self.exc = self.exc, None
+        return exc if self.promise._state is PENDING else None
+
+    def send(self, value):
+        exc = self._pop()
+        if exc is None:
+            return self.gen.send(value)
+        if self.source is not None:
+            return self._leave(exc, 'send', value)
+        return self.gen.throw(exc)
+
+    def throw(self, typ, val=None, tb=None):
+        exc = self._pop()
+        if exc is None:
+            return self.gen.throw(typ, val, tb)
+        if self.source is not None:
+            return self._leave(exc, 'throw', typ if val is None else val)
+        return self.gen.throw(exc)
+
+    def close(self):
+        self.gen.close()
+
+    def _leave(self, exc, method, arg):
+        self.source._hand_over(method, arg)
+        self.gen.close()
+        raise exc
+
+
+class _Dependency:
+    """Evaluate a Promise on behalf of a Promise that depends on it, such as one created with `then()`.
+
+    Unlike `yield from promise`, closing the dependent Promise's executor, e.g. because it was cancelled, does not
+    close the Promise it depends on, which other Promises may still depend on.
+    """
+
+    __slots__ = ('promise',)
+
+    def __init__(self, promise: 'Promise'):
+        self.promise = promise
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.promise.send(None)
+
+    def send(self, value):
+        return self.promise.send(value)
+
+    def throw(self, typ, val=None, tb=None):
+        return self.promise.throw(typ, val, tb)
+
+
 class Promise:
     """The Promise class.
 
@@ -154,6 +234,7 @@ class Promise:
         self._prepare(executor, named)
 
         self._resolvers: deque = deque()
+        self._source: Optional[Tuple[Promise, Callable]] = None
 
     def _prepare(self, executor, named=None):
         self._exec = as_generator_func(executor)(self._make_resolution, self._make_rejection)
@@ -218,6 +299,70 @@ class Promise:
             return self._value
         return default
 
+    @property
+    def is_cancelled(self) -> bool:
+        """Return True if the Promise was cancelled, i.e. it is REJECTED with `PromiseCancelled`, and False otherwise."""
+        return self._state is REJECTED and isinstance(self._value, PromiseCancelled)
+
+    def cancel(self, reason=None) -> bool:
+        """Cancel the Promise if it is still PENDING, and return whether it was.
+
+        Parameters
+        ----------
+        reason : Any, optional
+            Why the Promise is cancelled, kept as the `reason` of the `PromiseCancelled` it rejects with.
+
+        Description
+        -----------
+        If the executor has not started, it never will. If it is suspended, `PromiseCancelled` is raised where it is
+        suspended, so that `try-finally` blocks in it run, and so does any Promise it is currently evaluating, such as
+        the Promise a `then()` Promise is waiting for. The Promise then rejects with `PromiseCancelled`.
+
+        Cancellation spreads along the chain: Promises chained with `then()` and `catch()` are cancelled as well,
+        without calling their handlers, while `finally_()` handlers still run, so that resources are released.
+
+        Cancelling a Promise chained to another one (with `then()`, `catch()`, or `finally_()`) does not affect the
+        other branches of that Promise: it is detached from the Promise, which keeps running for the others. Only if
+        it was the last Promise depending on it, and nothing else is evaluating it, is that Promise cancelled as well
+        (and this one with it).
+
+        Cancelled Promises do not cause `UnhandledPromiseRejectionWarning`s.
+
+        The Promise is evaluated until it settles right away. If it is cancelled from within its own evaluation,
+        e.g. by one of its handlers, the cancellation takes effect the next time the Promise yields.
+        """
+        if self._state is not PENDING:
+            return False
+        if isinstance(self._exec, _Interruption):
+            return True
+        source = None
+        if self._source is not None:
+            parent, resolver = self._source
+            if parent._state is PENDING and resolver in parent._resolvers:
+                if len(parent._resolvers) == 1 and parent._evaluated_only_by(self):
+                    return parent.cancel(reason)
+                parent._resolvers.remove(resolver)
+                self._source = None
+                source = parent
+        running = getattr(self._exec, 'gi_running', False)
+        self._exec = _Interruption(self, self._exec, PromiseCancelled(self, reason), source)
+        if not running:
+            self._unwind()
+        return True
+
+    def _evaluated_only_by(self, promise: 'Promise') -> bool:
+        """Return True if nothing but `promise` is evaluating this Promise, so that it can be cancelled with it."""
+        return True
+
+    def _hand_over(self, method: str, arg):
+        """Let this Promise continue without the detached Promise that was evaluating it. Nothing to do by default."""
+        pass
+
+    def _unwind(self):
+        """Evaluate a cancelled Promise until it settles."""
+        for _ in self:
+            pass
+
     def is_rejected_due_to(self, exc_class) -> bool:
         """Check whether the Promise was rejected due to a specific type of exception.
 
@@ -263,8 +408,9 @@ class Promise:
     def _run_resolvers(self):
         """Process resolvers."""
         if not self._resolvers and self._state is REJECTED:
-            with one_line_warning_format():
-                warnings.warn(UnhandledPromiseRejectionWarning(self))
+            if not self.is_cancelled:
+                with one_line_warning_format():
+                    warnings.warn(UnhandledPromiseRejectionWarning(self))
             return
         while self._resolvers:
             yield from self._resolvers.popleft()(self)
@@ -284,7 +430,11 @@ class Promise:
 
         if isinstance(returned, cls):
             yield from returned
-            yield from returned.then(this._make_resolution, this._make_rejection)
+            adoption = returned.then(this._make_resolution, this._make_rejection)
+            yield from adoption
+            if this._state is PENDING and adoption._state is REJECTED:
+                # The adoption itself failed (e.g. RecursionError), which would otherwise go unnoticed.
+                yield from this._reject(adoption._value)
             return returned
 
         if getattr(returned, 'then', None) and callable(returned.then):
@@ -295,7 +445,7 @@ class Promise:
     def _successor_executor(self, resolve=None, reject=None):
         """Executor to be used in Promises created with Promise.then(), etc."""
         if self._state is PENDING:
-            yield from self
+            yield from _Dependency(self)
         else:
             yield from self._run_resolvers()
 
@@ -408,6 +558,8 @@ class Promise:
         }
 
         def resolver(settled: PromiseType):
+            if settled.is_cancelled:
+                return (yield from promise._reject(settled._value))
             try:
                 handler = handlers[settled._state](settled._value)
                 yield from handler
@@ -417,6 +569,7 @@ class Promise:
             except BaseException as e:
                 yield from promise._reject(e)
         self._add_resolver(resolver)
+        promise._source = (self, resolver)
 
         return promise
 
@@ -474,6 +627,7 @@ class Promise:
             except BaseException as e:
                 yield from promise._reject(e)
         self._add_resolver(resolver)
+        promise._source = (self, resolver)
 
         return promise
 
@@ -490,6 +644,24 @@ class Promise:
         """Return a Promise that is already REJECTED with `reason`."""
         return cls(lambda _, reject: (yield from reject(reason)))
 
+    @classmethod
+    def _settled(cls: Type[PromiseType], state: PromiseState, value=None, named=None) -> PromiseType:
+        """Return a Promise that is already settled, without creating an executor for it.
+
+        Used where Promises must fail (or succeed) fast and in large numbers, e.g. by an open circuit breaker.
+        Evaluating the Promise only runs its resolvers.
+        """
+        promise = cls.__new__(cls)
+        promise._state = state
+        promise._value = value
+        promise.__qualname__ = '%s at %s' % (cls.__name__, hex(id(promise)))
+        promise._name = named or state.value
+        promise._resolvers = deque()
+        promise._source = None
+        promise._exec = promise._run_resolvers()
+        promise._hash = hash(promise._exec)
+        return promise
+
     @classmethod
     def settle(cls, promise: PromiseType) -> PromiseType:
         """Run the Promise until it's settled.
@@ -628,6 +800,220 @@ class Promise:
             p._add_resolver(resolver)
         return promise
 
+    @classmethod
+    def some(cls: Type[PromiseType], k: int, *promises: PromiseType) -> PromiseType:
+        """Return a new Promise that fulfills as soon as `k` of the provided Promises are FULFILLED.
+
+        If it fulfills, its handlers will receive a `list` of the values of the first `k` Promises to fulfill,
+        in the order they fulfilled.
+
+        If so many Promises reject that `k` of them can no longer fulfill, it rejects with a PromiseAggregateError
+        right away.
+
+        `Promise.some(1, ...)` is similar to `Promise.any(...)` but fulfills with a list, and
+        `Promise.some(len(promises), ...)` is similar to `Promise.all(...)` but does not preserve order.
+
+        Raises
+        ------
+        ValueError
+            If `k` is less than 1 or more than the number of Promises.
+
+        Note
+        ----
+        - All Promises are evaluated regardless of fulfillments.
+        """
+        cls._ensure_promise(promises)
+        if not 1 <= k <= len(promises):
+            raise ValueError('k must be between 1 and the number of Promises')
+        fulfillments = []
+        rejection_count = 0
+        promise = cls(cls._make_multi_executor(promises), named='Promise.some')
+
+        def resolver(settled: PromiseType):
+            nonlocal rejection_count
+            if promise._state is not PENDING:
+                return
+            if settled._state is FULFILLED:
+                fulfillments.append(settled._value)
+                if len(fulfillments) == k:
+                    yield from promise._resolve(fulfillments)
+            else:
+                rejection_count += 1
+                if len(promises) - rejection_count < k:
+                    yield from promise._reject(PromiseAggregateError(
+                        'Fewer than %d Promises in Promise.some were resolved.' % k,
+                    ))
+
+        for p in promises:
+            p._add_resolver(resolver)
+        return promise
+
+    @classmethod
+    def _observe(cls, settled: PromiseType):
+        """Resolver that does nothing, so that rejections that are handled elsewhere are not reported as unhandled."""
+        yield from ()
+
+    @classmethod
+    def as_completed(cls, *promises: PromiseType) -> Iterator[PromiseType]:
+        """Return an iterator that produces each of the provided Promises once it has settled.
+
+        Unlike `Promise.all_settled()`, which produces all the Promises at once at the end, this lets processing
+        begin as soon as the first Promise has settled. The Promises are produced themselves, whether they are
+        FULFILLED or REJECTED; their rejections are considered handled.
+
+        Note
+        ----
+        - The Promises that are already settled are produced first, then the remaining ones are evaluated
+        sequentially and produced one by one, in the order they were provided.
+        - Evaluation is lazy: a Promise is only evaluated when the iterator is asked for the next one.
+        """
+        cls._ensure_promise(promises)
+
+        def iterator():
+            pending = []
+            for p in promises:
+                if p._state is PENDING:
+                    p._add_resolver(cls._observe)
+                    pending.append(p)
+                else:
+                    yield p
+            for p in pending:
+                yield cls.settle(p)
+
+        return iterator()
+
+    @classmethod
+    def _sleep(cls, seconds: float):
+        """Wait for `seconds` as part of an executor. Blocks, since there is no event loop to hand control to."""
+        if seconds > 0:
+            time.sleep(seconds)
+        yield from ()
+
+    @classmethod
+    def _should_retry(cls, retry_on, reason) -> bool:
+        if isinstance(retry_on, type) or isinstance(retry_on, tuple):
+            return isinstance(reason, retry_on)
+        return bool(retry_on(reason))
+
+    @classmethod
+    def retry(
+        cls: Type[PromiseType], factory: Callable[[], Any], attempts: int = 3, *, backoff: float = 0,
+        max_backoff: Optional[float] = None, jitter: float = 0, retry_on=Exception, budget=None,
+    ) -> PromiseType:
+        """Return a new Promise that calls `factory` to make a Promise, and calls it again while that Promise rejects.
+
+        Parameters
+        ----------
+        factory : Callable
+            a function that takes no arguments and returns a Promise (or a plain value); it is called once per attempt
+        attempts : int, optional
+            the maximum number of attempts, including the first one, by default 3
+        backoff : float, optional
+            the delay in seconds before the first retry, which doubles with each retry, by default 0 (no delay)
+        max_backoff : float, optional
+            the maximum delay before a retry, by default unlimited
+        jitter : float, optional
+            between 0 and 1, the fraction of each delay that is randomized, by default 0; with 1 ("full jitter"),
+            each delay is picked uniformly between 0 and the backoff delay, which spreads out retries from many callers
+        retry_on : Union[Type[BaseException], Tuple, Callable], optional
+            the exception classes that are retried, or a function that takes the reason of a rejection and returns
+            whether to retry, by default Exception
+        budget : RetryBudget, optional
+            a `notcallback.resilience.RetryBudget` shared with other calls; retries that the budget does not allow
+            are not made, by default unlimited
+
+        Description
+        -----------
+        The attempts are run one after another in a loop, so the memory used stays the same however many attempts
+        are made. The Promise adopts the state and value of the last attempt: it fulfills with the value of the
+        first attempt that fulfills, or rejects with the reason of the last one once `attempts` is reached,
+        the reason is not to be retried, or the budget is exhausted.
+
+        With `notcallback.promise.Promise`, the delays block the thread with `time.sleep()`;
+        `notcallback.async_.Promise` waits with `asyncio.sleep()` instead.
+
+        Returns
+        -------
+        Promise
+            The new Promise
+        """
+        if attempts < 1:
+            raise ValueError('attempts must be at least 1')
+        if not 0 <= jitter <= 1:
+            raise ValueError('jitter must be between 0 and 1')
+
+        def executor(resolve, reject):
+            if budget is not None:
+                budget.record_call()
+            delay = backoff
+            for attempt in range(1, attempts + 1):
+                try:
+                    promise = factory()
+                except (PromiseException, PromiseWarning, GeneratorExit, KeyboardInterrupt, SystemExit):
+                    raise
+                except BaseException as e:
+                    promise = cls.reject(e)
+                if not isinstance(promise, cls):
+                    promise = cls.resolve(promise)
+                promise._add_resolver(cls._observe)
+                yield from promise._successor_executor()
+                if promise._state is FULFILLED:
+                    return (yield from resolve(promise._value))
+                if promise._state is PENDING:
+                    return (yield from resolve(promise))
+                reason = promise._value
+                del promise
+                if (
+                    attempt == attempts
+                    or not cls._should_retry(retry_on, reason)
+                    or (budget is not None and not budget.try_retry())
+                ):
+                    return (yield from reject(reason))
+                pause = delay if max_backoff is None else min(delay, max_backoff)
+                yield from cls._sleep(pause * (1 - jitter * random.random()))
+                delay *= 2
+
+        return cls(executor, named='Promise.retry')
+
+    @classmethod
+    def paginate(cls, fetch_page: Callable[[Any], Any], next_cursor: Callable[[Any], Any], cursor=None) -> Iterator:
+        """Return an iterator over the pages of a paginated resource, fetching each page when it is asked for.
+
+        Parameters
+        ----------
+        fetch_page : Callable
+            a function that takes a cursor and returns a Promise (or a plain value) of the page at that cursor
+        next_cursor : Callable
+            a function that takes a page and returns the cursor of the page after it, or None if it is the last one
+        cursor : optional
+            the cursor of the first page, by default None
+
+        Description
+        -----------
+        Instead of returning the Promise of the next page from a `then()` handler, which grows the chain by one
+        Promise per page, the pages are fetched in a loop and produced one at a time, so the memory used stays the
+        same however many pages there are. If the Promise of a page rejects, the iterator raises the reason.
+
+        With `notcallback.promise.Promise`, there is nothing to run concurrently with the consumer, so each page is
+        fetched when the consumer asks for it; `notcallback.async_.Promise` returns an async iterator that fetches
+        the next pages ahead of the consumer.
+        """
+        def iterator(cursor):
+            while True:
+                page = fetch_page(cursor)
+                if isinstance(page, cls):
+                    page._add_resolver(cls._observe)
+                    page = cls.settle(page)
+                    if page._state is REJECTED:
+                        _reraise(page._value)
+                    page = page._value
+                cursor = next_cursor(page)
+                yield page
+                if cursor is None:
+                    return
+
+        return iterator(cursor)
+
     def __iter__(self):
         """Return self as the iterable."""
         return self
@@ -0,0 +1,455 @@
+# MIT License
+#
+# Copyright (c) 2020 Tony Wu <tony[dot]wu(at)nyu[dot]edu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Policies that keep retries, slow calls, and failures from amplifying load."""
+
+import asyncio
+import time
+import weakref
+from collections import deque
+from enum import Enum
+from functools import wraps
+
+from .async_ import Promise as AsyncPromise
+from .base import PENDING, REJECTED
+from .exceptions import AdmissionRejected, CircuitOpenError
+from .promise import Promise
+
+try:
+    from typing import Any, Callable, Dict, Optional, Type
+except ImportError:
+    pass
+
+
+class RetryBudget:
+    """Limit retries to a fraction of calls, so that retries do not multiply the load on a failing dependency.
+
+    Each call (e.g. each `Promise.retry()`) deposits `ratio` tokens in the budget, and each retry withdraws one.
+    A retry is only allowed if there is a whole token left, so that over time at most `ratio` of the calls are
+    retried, no matter how many attempts each call allows. The budget starts with `reserve` tokens, which lets
+    clients with little traffic retry too, and holds at most `max_balance` tokens (by default `reserve`), so that
+    a long quiet period does not allow a burst of retries later.
+
+    The same budget is meant to be shared by all the calls to one dependency.
+    """
+
+    def __init__(self, ratio: float = 0.1, *, reserve: float = 10, max_balance: float = None):
+        """Create a budget that retries at most `ratio` of the calls, plus a `reserve`."""
+        if ratio < 0:
+            raise ValueError('ratio cannot be negative')
+        self.ratio = ratio
+        self.max_balance = reserve if max_balance is None else max_balance
+        self._balance = float(min(reserve, self.max_balance))
+        self.calls = 0
+        self.retries = 0
+        self.denied = 0
+
+    @property
+    def balance(self) -> float:
+        """Return the number of tokens left."""
+        return self._balance
+
+    def record_call(self):
+        """Record a new call, which earns `ratio` tokens."""
+        self.calls += 1
+        self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def try_retry(self) -> bool:
+        """Withdraw a token and return True if a retry is allowed, or return False."""
+        if self._balance >= 1:
+            self._balance -= 1
+            self.retries += 1
+            return True
+        self.denied += 1
+        return False
+
+    def __repr__(self):
+        return '<%s ratio=%s balance=%.2f calls=%d retries=%d denied=%d>' % (
+            self.__class__.__name__, self.ratio, self._balance, self.calls, self.retries, self.denied,
+        )
+
+
+class LatencyTracker:
+    """Keep track of recent latencies and estimate a percentile of them, e.g. to use as the delay of `Promise.hedge()`.
+
+    The estimate is computed over the last `window` observations, and is `default` until there are any.
+    Calling the tracker returns the estimate.
+    """
+
+    def __init__(self, percentile: float = 0.95, *, window: int = 1000, default: float = 0.1):
+        """Create a tracker estimating the given `percentile` (between 0 and 1) of the observed latencies."""
+        if not 0 < percentile <= 1:
+            raise ValueError('percentile must be between 0 and 1')
+        self.percentile = percentile
+        self.default = default
+        self._samples = deque(maxlen=window)
+        self._estimate = None
+        self._stale = 0
+
+    def observe(self, seconds: float):
+        """Record a latency, in seconds."""
+        self._samples.append(seconds)
+        self._stale += 1
+
+    def estimate(self) -> float:
+        """Return the estimated percentile of the recent latencies, in seconds."""
+        if not self._samples:
+            return self.default
+        # Sorting the window for every call would dominate the cost of hedging, so the estimate is only
+        # recomputed once enough new latencies have been observed.
+        if self._estimate is None or self._stale * 20 >= len(self._samples):
+            ordered = sorted(self._samples)
+            self._estimate = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+            self._stale = 0
+        return self._estimate
+
+    __call__ = estimate
+
+    def __len__(self):
+        """Return the number of latencies in the window."""
+        return len(self._samples)
+
+
+class BreakerState(Enum):
+    """Enum of possible circuit breaker states.
+
+    - `CLOSED`: calls are made, and their outcomes are recorded.
+    - `OPEN`: calls are refused right away, until `open_for` seconds have passed.
+    - `HALF_OPEN`: a few trial calls are made to find out whether the dependency has recovered; the other calls
+    are refused.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __str__(self):
+        """Print BreakerState."""
+        return self.value
+
+
+CLOSED = BreakerState.CLOSED
+OPEN = BreakerState.OPEN
+HALF_OPEN = BreakerState.HALF_OPEN
+
+
+class CircuitBreaker:
+    """Fail calls to an unhealthy dependency fast, instead of letting them pile up until they time out.
+
+    The breaker wraps functions that return Promises of `promise_class` (`notcallback.promise.Promise` by default,
+    or `notcallback.async_.Promise`), and records the outcome of the last `window` calls. A call fails if its Promise
+    rejects, or if it takes longer than `slow_call_threshold` seconds to settle, measured from the call.
+
+    - While CLOSED, once at least `minimum_calls` calls are recorded and the fraction of failures reaches
+    `failure_threshold`, the breaker opens.
+    - While OPEN, calls return an already rejected Promise (with `CircuitOpenError`) without calling the function,
+    and without creating an executor. After `open_for` seconds, the breaker becomes half-open.
+    - While HALF_OPEN, up to `half_open_calls` trial calls are made at a time. If `half_open_calls` trials in a row
+    succeed, the breaker closes and forgets past outcomes; if one fails, it opens again.
+
+    Outcomes are observed with `finally_()`: the Promise returned by a call is the one from the wrapped function with
+    a `finally_()` attached, so it must be evaluated (or `await`ed) for its outcome to be recorded.
+    """
+
+    def __init__(
+        self, promise_class: Type[Promise] = Promise, *, failure_threshold: float = 0.5, minimum_calls: int = 10,
+        window: int = 20, slow_call_threshold: Optional[float] = None, open_for: float = 30.0,
+        half_open_calls: int = 1, clock: Callable[[], float] = time.monotonic,
+    ):
+        """Create a closed circuit breaker for functions returning Promises of `promise_class`."""
+        if not 0 < failure_threshold <= 1:
+            raise ValueError('failure_threshold must be between 0 and 1')
+        if not 1 <= minimum_calls <= window:
+            raise ValueError('minimum_calls must be between 1 and window')
+        if half_open_calls < 1:
+            raise ValueError('half_open_calls must be at least 1')
+        self.promise_class = promise_class
+        self.failure_threshold = failure_threshold
+        self.minimum_calls = minimum_calls
+        self.slow_call_threshold = slow_call_threshold
+        self.open_for = open_for
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = None
+        self._trials = 0
+        self._successful_trials = 0
+        self.refused = 0
+
+    @property
+    def state(self) -> BreakerState:
+        """Return the current state of the breaker."""
+        if self._state is OPEN and self.clock() - self._opened_at >= self.open_for:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    @property
+    def failure_rate(self) -> float:
+        """Return the fraction of failures among the recorded calls."""
+        return self._failures / len(self._outcomes) if self._outcomes else 0.0
+
+    @property
+    def recorded_calls(self) -> int:
+        """Return the number of calls whose outcomes are currently recorded."""
+        return len(self._outcomes)
+
+    def _transition(self, state: BreakerState):
+        self._state = state
+        self._trials = 0
+        self._successful_trials = 0
+        if state is OPEN:
+            self._opened_at = self.clock()
+        elif state is CLOSED:
+            self._outcomes.clear()
+            self._failures = 0
+
+    def reset(self):
+        """Close the breaker and forget past outcomes."""
+        self._transition(CLOSED)
+
+    def _record(self, failed: bool):
+        if self._state is HALF_OPEN:
+            self._trials -= 1
+            if failed:
+                self._transition(OPEN)
+                return
+            self._successful_trials += 1
+            if self._successful_trials >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+        if self._state is not CLOSED:
+            return
+        if len(self._outcomes) == self._outcomes.maxlen:
+            self._failures -= self._outcomes[0]
+        self._outcomes.append(failed)
+        self._failures += failed
+        if len(self._outcomes) >= self.minimum_calls and self.failure_rate >= self.failure_threshold:
+            self._transition(OPEN)
+
+    def call(self, factory: Callable[..., Promise], *args, **kwargs) -> Promise:
+        """Call `factory(*args, **kwargs)` through the breaker, and return its Promise, or a rejected one if open."""
+        state = self.state
+        if state is OPEN or (state is HALF_OPEN and self._trials >= self.half_open_calls):
+            self.refused += 1
+            return self.promise_class._settled(REJECTED, CircuitOpenError(self), named='CircuitBreaker')
+        if state is HALF_OPEN:
+            self._trials += 1
+        start = self.clock()
+        try:
+            promise = factory(*args, **kwargs)
+        except (GeneratorExit, KeyboardInterrupt, SystemExit):
+            raise
+        except BaseException as e:
+            self._record(True)
+            return self.promise_class._settled(REJECTED, e, named='CircuitBreaker')
+        if not isinstance(promise, self.promise_class):
+            self._record(True)
+            raise TypeError('%s is not an instance of %s' % (repr(promise), repr(self.promise_class)))
+
+        def observe():
+            slow = self.slow_call_threshold is not None and self.clock() - start > self.slow_call_threshold
+            self._record(promise._state is REJECTED or slow)
+
+        return promise.finally_(observe)
+
+    def wrap(self, factory: Callable[..., Promise]) -> Callable[..., Promise]:
+        """Return a function that calls `factory` through the breaker."""
+        @wraps(factory)
+        def wrapped(*args, **kwargs):
+            return self.call(factory, *args, **kwargs)
+        return wrapped
+
+    def __repr__(self):
+        return '<%s %s failure_rate=%.2f recorded_calls=%d refused=%d>' % (
+            self.__class__.__name__, self.state, self.failure_rate, self.recorded_calls, self.refused,
+        )
+
+
+class AdmissionController:
+    """Shed load by limiting how many Promises made through it may be PENDING at the same time.
+
+    Functions returning Promises of `promise_class` are called through the controller. Each Promise counts as
+    pending from the call until it settles (or is garbage-collected without settling). At most `max_pending` Promises
+    may be pending in total, and at most `limits[tag]` of those with a given `tag` (e.g. one tag per caller class,
+    endpoint, or tenant).
+
+    Above these thresholds, a call is either:
+
+    - rejected immediately with `AdmissionRejected`, without calling the function, and without creating an executor
+    for the rejected Promise (the default); or
+    - with `notcallback.async_.Promise` and `max_wait` set, queued until a slot frees up, for at most `max_wait`
+    seconds before being rejected. Queued calls are started as tasks right away, so the wait is bounded whether or
+    not anything awaits them. At most `max_queue` calls can wait at the same time; calls beyond that are rejected
+    immediately.
+
+    Outcomes are observed with `finally_()`, see `CircuitBreaker`.
+    """
+
+    def __init__(
+        self, promise_class: Type[Promise] = Promise, *, max_pending: int, limits: Optional[Dict[Any, int]] = None,
+        max_wait: Optional[float] = None, max_queue: Optional[int] = None,
+    ):
+        """Create an admission controller letting at most `max_pending` Promises of `promise_class` be pending."""
+        if max_pending < 1:
+            raise ValueError('max_pending must be at least 1')
+        if max_wait is not None and not issubclass(promise_class, AsyncPromise):
+            raise ValueError('max_wait requires notcallback.async_.Promise')
+        self.promise_class = promise_class
+        self.max_pending = max_pending
+        self.limits = dict(limits or {})
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._pending = 0
+        self._pending_by_tag: Dict[Any, int] = {}
+        self._queue = deque()
+        self._queued = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def pending(self, tag=None) -> int:
+        """Return the number of pending Promises with `tag`, or in total if `tag` is not given."""
+        if tag is None:
+            return self._pending
+        return self._pending_by_tag.get(tag, 0)
+
+    @property
+    def queued(self) -> int:
+        """Return the number of calls waiting for a slot."""
+        return self._queued
+
+    def _has_room(self, tag) -> bool:
+        if self._pending >= self.max_pending:
+            return False
+        limit = self.limits.get(tag)
+        return limit is None or self._pending_by_tag.get(tag, 0) < limit
+
+    def _acquire(self, tag):
+        self._pending += 1
+        self._pending_by_tag[tag] = self._pending_by_tag.get(tag, 0) + 1
+        self.admitted += 1
+
+    def _release(self, tag):
+        self._pending -= 1
+        remaining = self._pending_by_tag[tag] - 1
+        if remaining:
+            self._pending_by_tag[tag] = remaining
+        else:
+            del self._pending_by_tag[tag]
+        self._wake_up()
+
+    def _wake_up(self):
+        for entry in list(self._queue):
+            waiter, tag = entry
+            if waiter.done():
+                # Cancelled, but its `_abandon()` callback has not run yet.
+                self._abandon(entry)
+            elif self._has_room(tag):
+                self._queue.remove(entry)
+                self._queued -= 1
+                self._acquire(tag)
+                waiter.set_result(None)
+
+    def _abandon(self, entry):
+        """Forget a queued call that timed out or was cancelled, unless it was already forgotten."""
+        if entry[0].cancelled() and entry in self._queue:
+            self._queue.remove(entry)
+            self._queued -= 1
+
+    def _shed(self, tag) -> Promise:
+        self.shed += 1
+        return self.promise_class._settled(REJECTED, AdmissionRejected(self, tag), named='AdmissionController')
+
+    def _start(self, tag, factory, args, kwargs) -> Promise:
+        """Call the function in a slot that was already acquired, and track its Promise until it settles."""
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self._release(tag)
+
+        try:
+            promise = factory(*args, **kwargs)
+        except (GeneratorExit, KeyboardInterrupt, SystemExit):
+            release()
+            raise
+        except BaseException as e:
+            release()
+            return self.promise_class._settled(REJECTED, e, named='AdmissionController')
+        if not isinstance(promise, self.promise_class):
+            release()
+            raise TypeError('%s is not an instance of %s' % (repr(promise), repr(self.promise_class)))
+        if promise._state is not PENDING:
+            release()
+            return promise
+        weakref.finalize(promise, release)
+        return promise.finally_(release)
+
+    def call(self, factory: Callable[..., Promise], *args, tag=None, **kwargs) -> Promise:
+        """Call `factory(*args, **kwargs)` if there is room, and return its Promise, or else a rejected or queued one."""
+        if self._has_room(tag):
+            self._acquire(tag)
+            return self._start(tag, factory, args, kwargs)
+        if self.max_wait is None or (self.max_queue is not None and self._queued >= self.max_queue):
+            return self._shed(tag)
+        return self._enqueue(tag, factory, args, kwargs)
+
+    def _enqueue(self, tag, factory, args, kwargs) -> Promise:
+        waiter = asyncio.get_event_loop().create_future()
+        entry = (waiter, tag)
+        self._queue.append(entry)
+        self._queued += 1
+        waiter.add_done_callback(lambda _: self._abandon(entry))
+
+        def executor(resolve, reject):
+            try:
+                yield asyncio.wait_for(waiter, self.max_wait)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                return (yield from reject(AdmissionRejected(self, tag)))
+            except BaseException:
+                if waiter.done() and not waiter.cancelled():
+                    self._release(tag)
+                else:
+                    waiter.cancel()
+                raise
+            yield from resolve(self._start(tag, factory, args, kwargs))
+
+        promise = self.promise_class(executor, named='AdmissionController')
+        promise.start()
+        return promise
+
+    def wrap(self, factory: Callable[..., Promise], tag=None) -> Callable[..., Promise]:
+        """Return a function that calls `factory` through the controller, with `tag`."""
+        @wraps(factory)
+        def wrapped(*args, **kwargs):
+            return self.call(factory, *args, tag=tag, **kwargs)
+        return wrapped
+
+    def __repr__(self):
+        return '<%s pending=%d queued=%d admitted=%d shed=%d>' % (
+            self.__class__.__name__, self._pending, self._queued, self.admitted, self.shed,
+        )
@@ -0,0 +1,140 @@
+# MIT License
+#
+# Copyright (c) 2020 Tony Wu <tony[dot]wu(at)nyu[dot]edu>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""Coalescing timers for asyncio event loops.
+
+Each event loop gets one `TimerHeap`, which keeps all the timers in a heap and schedules a single `loop.call_at()`
+callback for the earliest of them, so that the number of handles the event loop has to track stays constant however
+many timers (e.g. Promise deadlines) are pending.
+"""
+
+import heapq
+import weakref
+from itertools import count
+
+try:
+    from typing import Callable, List
+except ImportError:
+    pass
+
+_heaps = weakref.WeakKeyDictionary()
+
+
+class Timer:
+    """A callback scheduled on a `TimerHeap`."""
+
+    __slots__ = ('when', 'seq', 'callback', 'cancelled', '_heap')
+
+    def __init__(self, when: float, seq: int, callback: Callable, heap: 'TimerHeap'):
+        self.when = when
+        self.seq = seq
+        self.callback = callback
+        self.cancelled = False
+        self._heap = heap
+
+    def __lt__(self, other: 'Timer'):
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    def cancel(self):
+        """Cancel the timer. Does nothing if it has already fired or been cancelled."""
+        if self._heap is not None:
+            self.cancelled = True
+            self.callback = None
+            self._heap._discard()
+            self._heap = None
+
+
+class TimerHeap:
+    """A heap of timers served by a single `loop.call_at()` callback."""
+
+    _COMPACT_THRESHOLD = 64
+
+    def __init__(self, loop):
+        """Create a timer heap for `loop`. Use `timers_for()` to get the shared heap of a loop instead."""
+        self._loop = loop
+        self._heap: List[Timer] = []
+        self._seq = count()
+        self._cancelled = 0
+        self._handle = None
+        self._when = None
+
+    def __len__(self):
+        """Return the number of pending timers."""
+        return len(self._heap) - self._cancelled
+
+    def call_at(self, when: float, callback: Callable) -> Timer:
+        """Call `callback` with no arguments at `when`, on the event loop clock (`loop.time()`)."""
+        timer = Timer(when, next(self._seq), callback, self)
+        heapq.heappush(self._heap, timer)
+        if self._when is None or when < self._when:
+            self._schedule()
+        return timer
+
+    def call_later(self, delay: float, callback: Callable) -> Timer:
+        """Call `callback` with no arguments after `delay` seconds."""
+        return self.call_at(self._loop.time() + delay, callback)
+
+    def _discard(self):
+        self._cancelled += 1
+        if self._cancelled > self._COMPACT_THRESHOLD and self._cancelled * 2 > len(self._heap):
+            self._heap = [timer for timer in self._heap if not timer.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _schedule(self):
+        heap = self._heap
+        while heap and heap[0].cancelled:
+            heapq.heappop(heap)
+            self._cancelled -= 1
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            self._when = None
+        if heap:
+            self._when = heap[0].when
+            self._handle = self._loop.call_at(self._when, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        self._when = None
+        heap = self._heap
+        now = self._loop.time()
+        while heap and heap[0].when <= now:
+            timer = heapq.heappop(heap)
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+            callback = timer.callback
+            timer.callback = None
+            timer._heap = None
+            callback()
+        if self._handle is None:
+            self._schedule()
+
+
+def timers_for(loop) -> TimerHeap:
+    """Return the `TimerHeap` shared by everything running on `loop`."""
+    heap = _heaps.get(loop)
+    if heap is None:
+        heap = _heaps[loop] = TimerHeap(loop)
+    return heap
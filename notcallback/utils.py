@@ -66,21 +66,26 @@ class _CachedGeneratorFunc:
                 if not self._func_is_generator:
                     self._result = self._func(*self._args, **self._kwargs)
                 else:
-                    try:
-                        return next(self._func)
-                    except StopIteration as stop:
-                        self._result = stop.value
+                    return self._step(self._func.__next__)
                 self._finished = True
             raise StopIteration(self._result)
 
+        def _step(self, method, *args):
+            try:
+                return method(*args)
+            except StopIteration as stop:
+                self._result = stop.value
+                self._finished = True
+                raise
+
         def send(self, value):
             if self._func_is_generator:
-                return self._func.send(value)
+                return self._step(self._func.send, value)
             raise StopIteration(self._result)
 
         def throw(self, typ, val=None, tb=None):
             if self._func_is_generator:
-                return self._func.throw(typ, val, tb)
+                return self._step(self._func.throw, typ, val, tb)
             if val is None:
                 if tb is None:
                     raise typ
@@ -11,7 +11,7 @@ clean_up()
 setup(
     **common_config,
     long_description=read_readme(),
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     include_package_data=True,
     tests_require=tests_require,
 )
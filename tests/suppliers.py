@@ -1,3 +1,8 @@
+import asyncio
+
+from notcallback.async_ import Promise as AsyncPromise
+
+
 def simple_resolve(resolve, reject):
     yield 1
     yield 3
@@ -16,3 +21,60 @@ def exceptional_reject(resolve, reject):
 
 def incorrect_resolve(resolve, reject):
     return resolve(True)
+
+
+def sleep(sec, value=None):
+    def executor(resolve, reject):
+        yield asyncio.sleep(sec)
+        yield from resolve(value)
+    return executor
+
+
+def sleeper(value, delay=.05, log=None):
+    async def executor(resolve, reject):
+        await asyncio.sleep(delay)
+        if isinstance(value, BaseException):
+            raise value
+        if log is not None:
+            log.append(value)
+        await resolve(value)
+    return AsyncPromise(executor)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Connection:
+    opened = 0
+
+    def __init__(self, id=None):
+        Connection.opened += 1
+        self.id = Connection.opened if id is None else id
+        self.healthy = True
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class RemoteConnection:
+    def __init__(self):
+        self.closed = False
+        self.interrupted = False
+
+    async def query(self, delay=1):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.interrupted = True
+            raise
+        return 'rows'
+
+    async def close(self):
+        await asyncio.sleep(0)
+        self.closed = True
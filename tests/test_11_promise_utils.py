@@ -169,3 +169,88 @@ def test_empty():
     Promise.settle(Promise.race())
     Promise.settle(Promise.all_settled())
     Promise.settle(Promise.any())
+
+
+def test_as_completed():
+    evaluated = []
+
+    def task(value, fail=False):
+        def executor(resolve, reject):
+            evaluated.append(value)
+            if fail:
+                yield from reject(value)
+            yield from resolve(value)
+        return Promise(executor)
+
+    promises = [task(1), task(2, fail=True), task(3), task(4)]
+    Promise.settle(promises[2])
+    it = Promise.as_completed(*promises)
+    assert next(it) is promises[2]
+    assert evaluated == [3]
+    assert next(it) is promises[0]
+    assert evaluated == [3, 1]
+    rest = list(it)
+    assert rest == [promises[1], promises[3]]
+    assert rest[0].is_rejected and rest[0].value == 2
+    assert list(Promise.as_completed()) == []
+    with pytest.raises(TypeError):
+        Promise.as_completed(1)
+
+
+def test_some():
+    promises = [Promise.reject(1), Promise.resolve(2), Promise.reject(3), Promise.resolve(4), Promise.resolve(5)]
+    p = Promise.some(2, *promises)
+    Promise.settle(p)
+    assert p.is_fulfilled
+    assert p.value == [2, 4]
+    assert promises[4].is_fulfilled
+
+
+def test_some_impossible():
+    settled = []
+    promises = [Promise.resolve(1), Promise.reject(2), Promise.reject(3), Promise.resolve(4)]
+    p = Promise.some(3, *promises)
+    p.catch(lambda e: settled.append(len([q for q in promises if not q.is_pending])))
+    Promise.settle(p)
+    assert p.is_rejected_due_to(PromiseAggregateError)
+    assert 'Fewer than 3' in str(p.value)
+    assert settled == [3]
+
+    with pytest.raises(ValueError):
+        Promise.some(0, Promise.resolve())
+    with pytest.raises(ValueError):
+        Promise.some(2, Promise.resolve())
+
+
+def test_paginate():
+    fetched = []
+
+    def fetch_page(cursor):
+        fetched.append(cursor)
+        if cursor == 3:
+            return {'items': [cursor], 'next': None}
+
+        def executor(resolve, reject):
+            yield cursor
+            yield from resolve({'items': [cursor], 'next': (cursor or 0) + 1})
+        return Promise(executor)
+
+    pages = Promise.paginate(fetch_page, lambda page: page['next'])
+    assert fetched == []
+    assert next(pages)['items'] == [None]
+    assert fetched == [None]
+    assert [page['items'] for page in pages] == [[1], [2], [3]]
+    assert fetched == [None, 1, 2, 3]
+
+
+def test_paginate_rejected():
+    def fetch_page(cursor):
+        if cursor == 2:
+            return Promise.reject(KeyError(cursor))
+        return Promise.resolve(cursor + 1)
+
+    pages = Promise.paginate(fetch_page, lambda page: page, cursor=0)
+    assert next(pages) == 1
+    assert next(pages) == 2
+    with pytest.raises(KeyError):
+        next(pages)
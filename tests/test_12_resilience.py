@@ -0,0 +1,218 @@
+import gc
+
+import pytest
+
+from notcallback import Promise
+from notcallback.exceptions import AdmissionRejected, CircuitOpenError
+from notcallback.resilience import CLOSED, HALF_OPEN, OPEN, AdmissionController, CircuitBreaker, RetryBudget
+
+from .suppliers import Clock
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+class Flaky:
+    def __init__(self, failures, exc=ConnectionError):
+        self.failures = failures
+        self.exc = exc
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        failing = self.calls <= self.failures
+
+        def executor(resolve, reject):
+            yield self.calls
+            if failing:
+                raise self.exc(self.calls)
+            yield from resolve('ok')
+        return Promise(executor)
+
+
+def test_retry_until_fulfilled():
+    flaky = Flaky(2)
+    p = Promise.retry(flaky, attempts=3)
+    assert list(p) == [1, 2, 3]
+    assert p.is_fulfilled
+    assert p.value == 'ok'
+    assert flaky.calls == 3
+
+
+def test_retry_exhausted():
+    flaky = Flaky(5)
+    p = Promise.settle(Promise.retry(flaky, attempts=3))
+    assert p.is_rejected_due_to(ConnectionError)
+    assert p.value.args == (3,)
+    assert flaky.calls == 3
+
+
+def test_retry_on():
+    flaky = Flaky(5, exc=KeyError)
+    p = Promise.settle(Promise.retry(flaky, attempts=3, retry_on=ConnectionError))
+    assert p.is_rejected_due_to(KeyError)
+    assert flaky.calls == 1
+
+    flaky = Flaky(1, exc=KeyError)
+    p = Promise.settle(Promise.retry(flaky, retry_on=lambda e: isinstance(e, KeyError)))
+    assert p.value == 'ok'
+
+
+def test_retry_plain_values_and_raising_factory():
+    calls = []
+
+    def factory():
+        calls.append(True)
+        if len(calls) < 2:
+            raise OSError()
+        return 42
+
+    assert Promise.settle(Promise.retry(factory)).value == 42
+    with pytest.raises(ValueError):
+        Promise.retry(factory, attempts=0)
+    with pytest.raises(ValueError):
+        Promise.retry(factory, jitter=2)
+
+
+def test_retry_many_attempts():
+    flaky = Flaky(4999)
+    p = Promise.settle(Promise.retry(flaky, attempts=5000))
+    assert p.value == 'ok'
+
+
+def test_retry_budget():
+    budget = RetryBudget(.1, reserve=2)
+    for _ in range(20):
+        Promise.settle(Promise.retry(Flaky(10), attempts=3, budget=budget))
+    assert budget.calls == 20
+    # Two retries from the reserve for the first call, then one per ten calls.
+    assert budget.retries == 3
+    assert budget.denied == 19
+    assert budget.balance < 1
+
+
+def test_retry_budget_recovers():
+    budget = RetryBudget(.5, reserve=1, max_balance=3)
+    for _ in range(10):
+        budget.record_call()
+    assert budget.balance == 3
+    assert budget.try_retry()
+    assert budget.balance == 2
+
+
+def test_circuit_breaker_opens_and_fails_fast():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=.5, minimum_calls=4, window=10, open_for=5, clock=clock)
+    calls = []
+
+    def call(ok):
+        calls.append(ok)
+        return Promise.resolve(ok) if ok else Promise.reject(ConnectionError())
+
+    for ok in [True, False, True, False]:
+        Promise.settle(breaker.call(call, ok))
+    assert breaker.state is OPEN
+    assert breaker.failure_rate == .5
+
+    p = breaker.call(call, True)
+    assert p.is_rejected_due_to(CircuitOpenError)
+    assert p.value.breaker is breaker
+    assert len(calls) == 4
+    assert breaker.refused == 1
+    assert Promise.settle(p.catch(lambda e: 'refused')).value == 'refused'
+
+
+def test_circuit_breaker_half_open():
+    clock = Clock()
+    breaker = CircuitBreaker(minimum_calls=1, window=5, open_for=5, half_open_calls=2, clock=clock)
+    fail = breaker.wrap(lambda: Promise.reject(ConnectionError()))
+    succeed = breaker.wrap(lambda: Promise.resolve('ok'))
+
+    Promise.settle(fail())
+    assert breaker.state is OPEN
+    clock.now = 5
+    assert breaker.state is HALF_OPEN
+
+    trial1, trial2, refused = succeed(), succeed(), succeed()
+    assert refused.is_rejected_due_to(CircuitOpenError)
+    Promise.settle(trial1)
+    assert breaker.state is HALF_OPEN
+    Promise.settle(trial2)
+    assert breaker.state is CLOSED
+    assert breaker.recorded_calls == 0
+
+    Promise.settle(fail())
+    clock.now = 10
+    Promise.settle(fail())
+    assert breaker.state is OPEN
+    clock.now = 14
+    assert breaker.state is OPEN
+    breaker.reset()
+    assert breaker.state is CLOSED
+
+
+def test_circuit_breaker_slow_calls_and_errors():
+    clock = Clock()
+    breaker = CircuitBreaker(minimum_calls=2, window=2, slow_call_threshold=1, clock=clock)
+
+    def slow(resolve, reject):
+        clock.now += 2
+        yield from resolve()
+
+    Promise.settle(breaker.call(lambda: Promise(slow)))
+    assert breaker.state is CLOSED
+    Promise.settle(breaker.call(lambda: Promise(slow)))
+    assert breaker.state is OPEN
+
+    breaker.reset()
+    p = breaker.call(lambda: 1 / 0)
+    assert p.is_rejected_due_to(ZeroDivisionError)
+    with pytest.raises(TypeError):
+        breaker.call(lambda: 'not a promise')
+    assert breaker.failure_rate == 1
+
+
+def test_admission_controller_sheds_load():
+    controller = AdmissionController(max_pending=2)
+    calls = []
+
+    def job(i):
+        calls.append(i)
+
+        def executor(resolve, reject):
+            yield from resolve(i)
+        return Promise(executor)
+
+    first, second = controller.call(job, 1), controller.call(job, 2)
+    assert controller.pending() == 2
+    shed = controller.call(job, 3)
+    assert shed.is_rejected_due_to(AdmissionRejected)
+    assert calls == [1, 2]
+    assert controller.shed == 1
+
+    assert Promise.settle(first).value == 1
+    assert controller.pending() == 1
+    fourth = controller.call(job, 4)
+    assert fourth.is_pending
+    assert controller.pending() == 2
+    # Promises that are garbage-collected without ever being settled give their slots back.
+    del second, fourth
+    gc.collect()
+    assert controller.pending() == 0
+
+
+def test_admission_controller_limits_per_tag():
+    controller = AdmissionController(max_pending=3, limits={'batch': 1})
+    pending = [controller.call(Promise, lambda resolve, reject: (yield), tag='batch')]
+    assert controller.call(Promise.resolve, 1, tag='batch').is_rejected
+    pending.append(controller.call(Promise, lambda resolve, reject: (yield), tag='web'))
+    pending.append(controller.call(Promise, lambda resolve, reject: (yield), tag='web'))
+    assert controller.call(Promise.resolve, 1, tag='web').is_rejected
+    assert controller.pending('web') == 2
+    assert controller.pending('batch') == 1
+    pending.clear()
+    gc.collect()
+    assert Promise.settle(controller.call(Promise.resolve, 1, tag='batch')).is_fulfilled
+    assert controller.pending() == 0
+    assert controller.call(lambda: 1 / 0).is_rejected_due_to(ZeroDivisionError)
+    with pytest.raises(ValueError):
+        AdmissionController(max_pending=1, max_wait=1)
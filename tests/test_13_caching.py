@@ -0,0 +1,136 @@
+import json
+import pickle
+
+import pytest
+
+from notcallback import Promise
+from notcallback.caching import PersistentCache, PromiseCache, memoize_promise
+
+from .suppliers import Clock
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+class Backend:
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, key, fail=False):
+        self.calls.append(key)
+
+        def executor(resolve, reject):
+            if fail:
+                yield from reject(KeyError(key))
+            yield from resolve(key * 2)
+        return Promise(executor)
+
+
+def test_memoize_single_flight():
+    backend = Backend()
+    fetch = memoize_promise(backend.fetch)
+    promises = [fetch(1) for _ in range(10)]
+    assert backend.calls == [1]
+    assert all(p is promises[0] for p in promises)
+    assert Promise.settle(promises[0]).value == 2
+    assert fetch(1).value == 2
+    assert fetch(2, fail=False) is not fetch(2)
+    info = fetch.cache.info()
+    assert (info.hits, info.misses, info.coalesced, info.currsize) == (1, 3, 9, 1)
+
+
+def test_memoize_lru_and_ttl():
+    backend = Backend()
+    clock = Clock()
+    fetch = memoize_promise(maxsize=2, ttl=10, clock=clock)(backend.fetch)
+    for key in (1, 2, 1, 3):
+        Promise.settle(fetch(key))
+    assert backend.calls == [1, 2, 3]
+    assert 2 not in fetch.cache
+    assert len(fetch.cache) == 2
+    clock.now = 10
+    Promise.settle(fetch(1))
+    assert backend.calls == [1, 2, 3, 1]
+
+
+def test_memoize_negative_ttl():
+    backend = Backend()
+    clock = Clock()
+    cache = PromiseCache(negative_ttl=1, clock=clock)
+    first = Promise.settle(cache.get('a', backend.fetch, 'a', fail=True))
+    assert first.is_rejected_due_to(KeyError)
+    assert cache.get('a', backend.fetch, 'a') is first
+    clock.now = 1
+    assert Promise.settle(cache.get('a', backend.fetch, 'a')).value == 'aa'
+    assert backend.calls == ['a', 'a']
+
+    uncached = PromiseCache()
+    Promise.settle(uncached.get('a', backend.fetch, 'a', fail=True))
+    assert len(uncached) == 0
+    assert uncached.get('b', lambda: 1 / 0).is_rejected_due_to(ZeroDivisionError)
+    with pytest.raises(TypeError):
+        uncached.get('c', lambda: 'not a promise')
+
+
+def test_cache_invalidate():
+    backend = Backend()
+    cache = PromiseCache()
+    Promise.settle(cache.get(1, backend.fetch, 1))
+    in_flight = cache.get(2, backend.fetch, 2)
+    cache.invalidate(1)
+    cache.invalidate(2)
+    Promise.settle(in_flight)
+    assert len(cache) == 0
+    cache.get(1, backend.fetch, 1)
+    cache.get(2, backend.fetch, 2)
+    assert backend.calls == [1, 2, 1, 2]
+
+
+def test_persistent_cache(tmp_path):
+    backend = Backend()
+    path = str(tmp_path / 'cache.sqlite')
+    with PersistentCache(path, batch_size=2) as cache:
+        assert Promise.settle(cache.get('a', backend.fetch, 'a')).value == 'aa'
+        assert cache._pending
+        # Buffered writes are served before they are committed.
+        assert cache.get('a', backend.fetch, 'a').value == 'aa'
+        Promise.settle(cache.get('b', backend.fetch, 'b'))
+        assert not cache._pending
+    with PersistentCache(path) as cache:
+        hit = cache.get('a', backend.fetch, 'a')
+        assert hit.is_fulfilled
+        assert hit.value == 'aa'
+        assert len(cache) == 2
+        with pytest.raises(TypeError):
+            cache.get(1, backend.fetch, 1)
+    assert backend.calls == ['a', 'b']
+
+
+def test_persistent_cache_expiry_and_size(tmp_path):
+    backend = Backend()
+    clock = Clock()
+    cache = PersistentCache(
+        str(tmp_path / 'cache.sqlite'), serializer=json, max_entries=2, ttl=10, negative_ttl=1, clock=clock,
+    )
+    for key in 'abc':
+        clock.now += 1
+        Promise.settle(cache.get(key, backend.fetch, key))
+    assert len(cache) == 2
+    assert 'a' not in cache
+    clock.now = 12
+    changes = cache._db.total_changes
+    assert 'b' not in cache
+    # The expired row is left for the next flush() to delete.
+    assert cache._db.total_changes == changes
+    assert 'c' in cache
+
+    # JSON cannot serialize the KeyError, so the rejection is not cached.
+    assert Promise.settle(cache.get('d', backend.fetch, 'd', fail=True)).is_rejected
+    assert 'd' not in cache
+    cache.serializer = pickle
+    Promise.settle(cache.get('d', backend.fetch, 'd', fail=True))
+    assert cache.get('d', backend.fetch, 'd').is_rejected_due_to(KeyError)
+    assert backend.calls == ['a', 'b', 'c', 'd', 'd']
+    cache.invalidate('c')
+    cache.clear()
+    assert len(cache) == 0
+    cache.close()
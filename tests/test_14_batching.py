@@ -0,0 +1,97 @@
+import warnings
+
+import pytest
+
+from notcallback import Promise
+from notcallback.batching import BatchLoader
+from notcallback.exceptions import UnhandledPromiseRejectionWarning
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+class Table:
+    def __init__(self):
+        self.queries = []
+
+    def fetch(self, ids):
+        self.queries.append(ids)
+        return [KeyError(i) if i < 0 else 'row%d' % i for i in ids]
+
+
+def test_batch_loader_implicit_flush():
+    table = Table()
+    loader = BatchLoader(table.fetch)
+    promises = [loader.load(i % 5) for i in range(20)]
+    assert table.queries == []
+    assert Promise.settle(loader.load_many(range(20))).value == ['row%d' % i for i in range(20)]
+    assert [p.value for p in promises] == ['row%d' % (i % 5) for i in range(20)]
+    assert table.queries == [list(range(20))]
+    assert loader.load(3).value == 'row3'
+    assert Promise.settle(loader.load(20)).value == 'row20'
+    assert table.queries == [list(range(20)), [20]]
+
+
+def test_batch_loader_explicit_flush_and_errors():
+    table = Table()
+    loader = BatchLoader(table.fetch, max_batch_size=2, cache=False)
+    promises = [loader.load(i) for i in (1, -1, 2, 1)]
+    loader.flush()
+    assert table.queries == [[1, -1], [2]]
+    assert [Promise.settle(p).is_fulfilled for p in promises] == [True, False, True, True]
+    assert promises[1].is_rejected_due_to(KeyError)
+    Promise.settle(loader.load(1))
+    assert table.queries == [[1, -1], [2], [1]]
+
+
+def test_batch_loader_batch_fn_failures():
+    def short(ids):
+        return ids[:-1]
+
+    def broken(ids):
+        raise ConnectionError()
+
+    promises = [BatchLoader(short).load(i) for i in range(2)]
+    assert Promise.settle(promises[0]).is_rejected_due_to(ValueError)
+    loader = BatchLoader(broken)
+    promises = [loader.load(i) for i in range(3)]
+    assert all(Promise.settle(p).is_rejected_due_to(ConnectionError) for p in promises)
+    assert loader.batches == 1
+
+    # The failure is handled through the Promises returned by load(), not reported for the batch itself.
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', UnhandledPromiseRejectionWarning)
+        caught = [loader.load(i).catch(lambda e: None) for i in range(3, 5)]
+        assert [Promise.settle(p).value for p in caught] == [None, None]
+
+
+def test_batch_loader_does_not_cache_failures():
+    calls = []
+
+    def flaky(ids):
+        calls.append(ids)
+        if len(calls) == 1:
+            raise ConnectionError()
+        return [KeyError(i) if i < 0 else 'row%d' % i for i in ids]
+
+    loader = BatchLoader(flaky)
+    assert Promise.settle(loader.load(1)).is_rejected_due_to(ConnectionError)
+    assert Promise.settle(loader.load(1)).value == 'row1'
+    assert Promise.settle(loader.load(-1)).is_rejected_due_to(KeyError)
+    assert Promise.settle(loader.load(-1)).is_rejected_due_to(KeyError)
+    assert loader.load(1).value == 'row1'
+    assert calls == [[1], [1], [-1], [-1]]
+
+
+def test_batch_loader_prime_and_clear():
+    table = Table()
+    loader = BatchLoader(table.fetch)
+    loader.prime(1, 'cached')
+    assert loader.load(1).value == 'cached'
+    assert Promise.settle(loader.load_many([1, 2])).value == ['cached', 'row2']
+    loader.clear(1)
+    assert Promise.settle(loader.load(1)).value == 'row1'
+    loader.clear()
+    Promise.settle(loader.load(2))
+    assert table.queries == [[2], [1], [2]]
+    with pytest.raises(ValueError):
+        BatchLoader(table.fetch, max_batch_size=0)
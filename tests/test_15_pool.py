@@ -0,0 +1,71 @@
+import pytest
+
+from notcallback import Promise
+from notcallback.exceptions import PoolExhausted
+from notcallback.pool import Pool
+
+from .suppliers import Clock, Connection
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+def make_pool(**kwargs):
+    return Pool(Connection, destroy=Connection.close, check=lambda c: c.healthy, **kwargs)
+
+
+def test_pool_reuses_resources():
+    pool = make_pool(max_size=2)
+    results = [Promise.settle(pool.use(lambda c: c.id)).value for _ in range(5)]
+    assert len(set(results)) == 1
+    assert (pool.size, pool.idle, pool.in_use) == (1, 1, 0)
+
+
+def test_pool_exhausted():
+    pool = make_pool(max_size=2)
+    first = Promise.settle(pool.acquire()).value
+    second = Promise.settle(pool.acquire()).value
+    assert first is not second
+    assert Promise.settle(pool.acquire()).is_rejected_due_to(PoolExhausted)
+    pool.release(first)
+    assert Promise.settle(pool.acquire()).value is first
+    pool.discard(second)
+    assert second.closed
+    assert Promise.settle(pool.acquire()).value not in (first, second)
+
+
+def test_pool_health_check_and_failures():
+    pool = make_pool(max_size=1)
+    conn = Promise.settle(pool.acquire()).value
+    pool.release(conn)
+    conn.healthy = False
+    replacement = Promise.settle(pool.use(lambda c: c)).value
+    assert replacement is not conn
+    assert conn.closed
+
+    def handler(c):
+        raise ConnectionError()
+
+    assert Promise.settle(pool.use(handler)).is_rejected_due_to(ConnectionError)
+    assert pool.idle == 1
+
+    broken = Pool(lambda: 1 / 0)
+    assert Promise.settle(broken.acquire()).is_rejected_due_to(ZeroDivisionError)
+    assert broken.size == 0
+
+
+def test_pool_warm_up_and_idle_eviction():
+    clock = Clock()
+    pool = make_pool(max_size=5, min_size=2, max_idle=10, clock=clock)
+    Promise.settle(pool.warm_up())
+    assert (pool.size, pool.idle) == (2, 2)
+    conns = [Promise.settle(pool.acquire()).value for _ in range(4)]
+    for conn in conns:
+        pool.release(conn)
+    assert pool.idle == 4
+    clock.now = 10
+    pool.evict_idle()
+    assert pool.size == 2
+    assert sum(c.closed for c in conns) == 2
+    pool.close()
+    assert all(c.closed for c in conns)
+    assert Promise.settle(pool.acquire()).is_rejected_due_to(RuntimeError)
@@ -0,0 +1,120 @@
+import warnings
+
+from notcallback import Promise
+from notcallback.exceptions import PromiseCancelled, UnhandledPromiseRejectionWarning
+
+
+def test_cancel_unstarted():
+    started = []
+
+    def executor(resolve, reject):
+        started.append(True)
+        yield from resolve(1)
+
+    p = Promise(executor)
+    handled = []
+    child = p.then(handled.append, handled.append)
+    cleaned = []
+    cleanup = p.finally_(lambda: cleaned.append(True))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', UnhandledPromiseRejectionWarning)
+        assert p.cancel('not needed')
+    assert not started
+    assert p.is_cancelled
+    assert p.value.reason == 'not needed'
+    assert child.is_cancelled
+    assert handled == []
+    assert cleaned == [True]
+    assert cleanup.is_cancelled
+    assert not p.cancel()
+
+
+def test_cancel_suspended_runs_cleanup():
+    steps = []
+
+    def executor(resolve, reject):
+        try:
+            yield 'working'
+            steps.append('finished')
+            yield from resolve(1)
+        finally:
+            steps.append('cleanup')
+
+    p = Promise(executor)
+    child = p.then(lambda v: v + 1)
+    assert next(child) == 'working'
+    assert child.cancel()
+    assert steps == ['cleanup']
+    assert p.is_cancelled
+    assert child.is_cancelled
+    assert Promise.settle(child) is child
+
+
+def test_cancel_one_branch():
+    steps = []
+
+    def executor(resolve, reject):
+        yield 'working'
+        yield from resolve(1)
+
+    p = Promise(executor)
+    cleanup = p.finally_(lambda: steps.append('cleanup'))
+    child = p.then(lambda v: steps.append(v))
+    assert next(cleanup) == 'working'
+    assert cleanup.cancel()
+    assert cleanup.is_cancelled
+    assert p.is_pending
+    assert child.is_pending
+    assert Promise.settle(child).is_fulfilled
+    assert p.value == 1
+    assert steps == [1]
+
+
+def test_cancel_handled_by_executor():
+    def executor(resolve, reject):
+        try:
+            yield 'working'
+        except PromiseCancelled:
+            yield from resolve('partial')
+
+    p = Promise(executor)
+    next(p)
+    p.cancel()
+    assert p.is_fulfilled
+    assert p.value == 'partial'
+
+
+def test_cancel_from_handler():
+    def executor(resolve, reject):
+        yield from resolve(1)
+        yield 'more'
+
+    def waiting(resolve, reject):
+        yield 'waiting'
+        yield from resolve(2)
+
+    def handler(value):
+        child.cancel()
+        yield 'after'
+        finished.append(True)
+
+    finished = []
+    p = Promise(executor)
+    child = p.then(handler)
+    other = Promise(waiting)
+    next(other)
+    p.then(lambda v: other.cancel())
+    assert list(child) == ['after', 'more']
+    # The cancellation took effect at the next yield, so the handler never finished.
+    assert not finished
+    assert child.is_cancelled
+    assert other.is_cancelled
+    assert p.is_fulfilled
+
+
+def test_cancelled_aggregates():
+    promises = [Promise.resolve(1), Promise(lambda resolve, reject: (yield))]
+    aggregate = Promise.all(*promises)
+    promises[1].cancel()
+    assert Promise.settle(aggregate).is_cancelled
+    assert Promise.settle(Promise.resolve(promises[1])).is_cancelled
@@ -0,0 +1,406 @@
+import asyncio
+import time
+
+import pytest
+
+from notcallback.async_ import Promise
+from notcallback.exceptions import PromiseCancelled
+
+from .suppliers import sleep
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+class EagerPromise(Promise):
+    eager = True
+
+
+def test_eager_without_loop():
+    executed = []
+
+    def executor(resolve, reject):
+        executed.append(True)
+        yield from resolve(1)
+
+    p = Promise(executor, eager=True)
+    assert p.is_pending
+    assert not executed
+
+
+@pytest.mark.asyncio
+async def test_lazy_by_default():
+    executed = []
+
+    def executor(resolve, reject):
+        executed.append(True)
+        yield from resolve(1)
+
+    p = Promise(executor)
+    await asyncio.sleep(0)
+    assert not executed
+    assert await p == 1
+
+
+@pytest.mark.asyncio
+async def test_eager_starts_immediately():
+    executed = []
+
+    def executor(resolve, reject):
+        executed.append(True)
+        yield from resolve(1)
+
+    p = Promise(executor, eager=True)
+    await asyncio.sleep(0)
+    assert executed
+    assert p.is_fulfilled
+    assert await p == 1
+
+
+@pytest.mark.asyncio
+async def test_eager_sequential_await():
+    start = time.perf_counter()
+    promises = [Promise(sleep(.2, i), eager=True) for i in range(5)]
+    results = [await p for p in promises]
+    duration = time.perf_counter() - start
+
+    assert results == list(range(5))
+    assert duration < .4
+
+
+@pytest.mark.asyncio
+async def test_eager_class_attribute():
+    start = time.perf_counter()
+    promises = [EagerPromise(sleep(.2, i)).then(lambda v: v * 2) for i in range(5)]
+    results = [await p for p in promises]
+    duration = time.perf_counter() - start
+
+    assert results == [i * 2 for i in range(5)]
+    assert duration < .4
+
+
+@pytest.mark.asyncio
+async def test_eager_branches():
+    p = Promise(sleep(.1, 3), eager=True)
+    p1 = p.then(lambda v: v + 1)
+    p2 = p.then(lambda v: v + 2)
+    assert await p2 == 5
+    assert await p1 == 4
+    p3 = p.then(lambda v: v + 3)
+    assert await p3 == 6
+
+
+@pytest.mark.asyncio
+async def test_eager_rejection():
+    def executor(resolve, reject):
+        yield asyncio.sleep(.01)
+        raise ValueError()
+
+    p = Promise(executor, eager=True)
+    handled = p.catch(lambda e: type(e))
+    with pytest.raises(ValueError):
+        await p
+    assert await handled is ValueError
+
+
+@pytest.mark.asyncio
+async def test_eager_returned_from_handler():
+    p = Promise.resolve(1).then(lambda v: Promise(sleep(.01, v + 1), eager=True))
+    assert await p == 2
+
+
+@pytest.mark.asyncio
+async def test_eager_async_iteration():
+    def executor(resolve, reject):
+        yield 1
+        yield 2
+        yield from resolve(3)
+
+    items = []
+    p = Promise(executor, eager=True)
+    async for i in p:
+        items.append(i)
+    assert items == []
+    assert p.value == 3
+
+
+async def delayed(sec, value):
+    await asyncio.sleep(sec)
+    return value
+
+
+async def fail(sec):
+    await asyncio.sleep(sec)
+    raise KeyError()
+
+
+@pytest.mark.asyncio
+async def test_yield_batch():
+    def executor(resolve, reject):
+        values = yield [delayed(.2, i) for i in range(5)]
+        yield from resolve(values)
+
+    start = time.perf_counter()
+    assert await Promise(executor) == list(range(5))
+    assert time.perf_counter() - start < .4
+
+
+@pytest.mark.asyncio
+async def test_yield_batch_in_handler():
+    def handler(value):
+        first, second = yield (delayed(.01, value), Promise.resolve(value * 2))
+        return first + second
+
+    assert await Promise.resolve(3).then(handler) == 9
+
+
+@pytest.mark.asyncio
+async def test_yield_batch_exception():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    def executor(resolve, reject):
+        try:
+            yield [slow(), fail(.01)]
+        except KeyError:
+            yield from resolve('caught')
+
+    assert await Promise(executor) == 'caught'
+    await asyncio.sleep(0)
+    assert cancelled
+
+
+@pytest.mark.asyncio
+async def test_yield_batch_async_iteration():
+    def executor(resolve, reject):
+        values = yield [delayed(.01, 1), delayed(.01, 2)]
+        yield values
+        yield [3, 4]
+        yield from resolve()
+
+    items = [i async for i in Promise(executor)]
+    assert items == [[1, 2], [3, 4]]
+
+
+@pytest.mark.asyncio
+async def test_async_def_executor():
+    async def executor(resolve, reject):
+        await asyncio.sleep(.01)
+        await resolve(42)
+
+    p = Promise(executor)
+    assert await p == 42
+    assert str(p).startswith("<Promise 'executor'")
+
+
+@pytest.mark.asyncio
+async def test_async_def_executor_reject():
+    async def executor(resolve, reject):
+        await asyncio.sleep(.01)
+        await reject(LookupError())
+
+    async def raising(resolve, reject):
+        await asyncio.sleep(.01)
+        raise IndexError()
+
+    with pytest.raises(LookupError):
+        await Promise(executor)
+    p = Promise(raising)
+    with pytest.raises(IndexError):
+        await p
+    assert p.is_rejected_due_to(IndexError)
+
+
+@pytest.mark.asyncio
+async def test_async_def_handlers():
+    values = []
+
+    async def double(value):
+        await asyncio.sleep(.01)
+        return value * 2
+
+    async def recover(exc):
+        await asyncio.sleep(.01)
+        return type(exc)
+
+    async def cleanup():
+        await asyncio.sleep(.01)
+        values.append('cleanup')
+
+    assert await Promise.resolve(4).then(double).then(double) == 16
+    assert await Promise.reject(ValueError()).catch(recover) is ValueError
+    assert await Promise.resolve(1).finally_(cleanup) == 1
+    assert values == ['cleanup']
+
+
+@pytest.mark.asyncio
+async def test_async_def_handler_raises():
+    async def throw(value):
+        raise TabError()
+
+    p = Promise.resolve(1).then(throw)
+    with pytest.raises(TabError):
+        await p
+
+
+@pytest.mark.asyncio
+async def test_async_gen_executor():
+    async def executor(resolve, reject):
+        for i in range(3):
+            await asyncio.sleep(.01)
+            yield i
+        await resolve('done')
+
+    p = Promise(executor)
+    items = [i async for i in p]
+    assert items == [0, 1, 2]
+    assert p.value == 'done'
+
+    p = Promise(executor)
+    assert await p == 'done'
+
+
+@pytest.mark.asyncio
+async def test_async_gen_executor_closed():
+    closed = []
+
+    async def executor(resolve, reject):
+        try:
+            for i in range(3):
+                yield i
+                await asyncio.sleep(.5)
+        finally:
+            await asyncio.sleep(0)
+            closed.append(True)
+
+    p = Promise(executor)
+    assert await p.__anext__() == 0
+    await p.aclose()
+    assert closed == [True]
+
+    p = Promise(executor)
+    p.start()
+    await asyncio.sleep(.01)
+    assert p.cancel()
+    with pytest.raises(PromiseCancelled):
+        await p
+    assert closed == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_async_def_concurrently():
+    def wait(sec):
+        async def executor(resolve, reject):
+            await asyncio.sleep(sec)
+            await resolve(sec)
+        return Promise(executor)
+
+    start = time.perf_counter()
+    assert await Promise.all(*[wait(.2) for _ in range(5)], concurrently=True) == [.2] * 5
+    assert time.perf_counter() - start < .4
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('concurrent', [False, True])
+async def test_concurrent_branches(concurrent):
+    started = []
+
+    def enrich(i):
+        async def handler(value):
+            started.append(i)
+            await asyncio.sleep(.2)
+            return value + i
+        return handler
+
+    p = Promise(sleep(.01, 9), concurrent_branches=concurrent).then(lambda v: v + 1)
+    branches = [p.then(enrich(i)) for i in range(5)]
+
+    start = time.perf_counter()
+    assert await Promise.all(*branches) == [10 + i for i in range(5)]
+    duration = time.perf_counter() - start
+
+    assert started == list(range(5))
+    if concurrent:
+        assert duration < .4
+    else:
+        assert duration >= 1
+
+
+def test_concurrent_branches_settled_synchronously():
+    p = Promise(lambda resolve, reject: (yield from resolve(1)), concurrent_branches=True)
+    branches = [p.then(lambda v: v + 1), p.then(lambda v: v + 2)]
+    Promise.settle(p)
+    assert [b.value for b in branches] == [2, 3]
+
+    p = Promise(lambda resolve, reject: (yield from resolve(1)), concurrent_branches=True)
+    branches = [p.then(lambda v: v + 1), p.then(lambda v: v + 2)]
+    assert list(p) == []
+    assert [b.value for b in branches] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_branches_rejection():
+    class ConcurrentPromise(Promise):
+        concurrent_branches = True
+
+    def throw(value):
+        raise UnicodeError()
+
+    p = ConcurrentPromise(sleep(.01, 1))
+    rejected = p.then(throw)
+    fulfilled = p.then(lambda v: v + 1)
+    handled = rejected.catch(lambda e: 'handled')
+
+    assert await fulfilled == 2
+    assert rejected.is_rejected_due_to(UnicodeError)
+    assert await handled == 'handled'
+
+
+@pytest.mark.asyncio
+async def test_async_iteration_many_awaits():
+    def executor(resolve, reject):
+        for i in range(5000):
+            yield asyncio.sleep(0)
+        yield 'item'
+        try:
+            yield fail(0)
+        except KeyError:
+            yield 'caught'
+        yield from resolve()
+
+    p = Promise(executor)
+    assert [i async for i in p] == ['item', 'caught']
+    assert p.is_fulfilled
+
+
+@pytest.mark.asyncio
+async def test_aclose():
+    closed = []
+
+    def executor(resolve, reject):
+        try:
+            yield 1
+            yield 2
+        finally:
+            closed.append(True)
+
+    p = Promise(executor)
+    assert await p.__anext__() == 1
+    await p.aclose()
+    assert closed
+
+    def stubborn(resolve, reject):
+        try:
+            yield 1
+        finally:
+            yield 2
+
+    p = Promise(stubborn)
+    await p.__anext__()
+    with pytest.raises(RuntimeError):
+        await p.aclose()
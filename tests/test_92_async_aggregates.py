@@ -0,0 +1,257 @@
+import asyncio
+import time
+
+import pytest
+
+from notcallback.async_ import Promise
+from notcallback.exceptions import PromiseAggregateError
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+class Tracker:
+    def __init__(self):
+        self.pulled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def inputs(self, n):
+        for i in range(n):
+            self.pulled += 1
+            yield i
+
+    def factory(self, delay=lambda i: .01, fail=()):
+        def make(i):
+            async def executor(resolve, reject):
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                await asyncio.sleep(delay(i))
+                self.in_flight -= 1
+                if i in fail:
+                    await reject(ValueError(i))
+                await resolve(i * 10)
+            return Promise(executor)
+        return make
+
+
+@pytest.mark.asyncio
+async def test_map_ordered():
+    t = Tracker()
+    results = await Promise.map(t.inputs(20), t.factory(lambda i: .01 * (i % 3)), limit=4)
+    assert results == [i * 10 for i in range(20)]
+    assert t.max_in_flight == 4
+
+
+@pytest.mark.asyncio
+async def test_map_unlimited():
+    t = Tracker()
+    start = time.perf_counter()
+    results = await Promise.map(range(50), t.factory(lambda i: .1))
+    assert results == [i * 10 for i in range(50)]
+    assert t.max_in_flight == 50
+    assert time.perf_counter() - start < .3
+
+
+@pytest.mark.asyncio
+async def test_map_lazy_inputs():
+    t = Tracker()
+    inputs = t.inputs(100)
+    p = Promise.map(inputs, t.factory(), limit=3)
+    assert t.pulled == 0
+    task = asyncio.ensure_future(p.awaitable())
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert t.pulled == 3
+    await task
+    assert t.pulled == 100
+
+
+@pytest.mark.asyncio
+async def test_map_plain_values():
+    assert await Promise.map(range(5), lambda i: i + 1, limit=2) == [1, 2, 3, 4, 5]
+    assert await Promise.map([], lambda i: i) == []
+
+
+@pytest.mark.asyncio
+async def test_map_rejection():
+    t = Tracker()
+    p = Promise.map(t.inputs(100), t.factory(fail={5}), limit=3)
+    with pytest.raises(ValueError):
+        await p
+    assert p.is_rejected_due_to(ValueError)
+    assert p.value.args == (5,)
+    assert t.pulled < 10
+    assert t.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_map_invalid_limit():
+    with pytest.raises(ValueError):
+        await Promise.map(range(3), lambda i: i, limit=0)
+
+
+@pytest.mark.asyncio
+async def test_map_unordered():
+    t = Tracker()
+    delays = {0: .3, 1: .1, 2: .2, 3: .01}
+    p = Promise.map_unordered(t.inputs(4), t.factory(delays.get), limit=4)
+    results = [i async for i in p]
+    assert results == [30, 10, 20, 0]
+    assert p.is_fulfilled
+
+
+@pytest.mark.asyncio
+async def test_map_unordered_backpressure():
+    t = Tracker()
+    p = Promise.map_unordered(t.inputs(100), t.factory(lambda i: 0), limit=2)
+    results = []
+    async for i in p:
+        results.append(i)
+        await asyncio.sleep(.01)
+        assert t.pulled <= len(results) + 4
+    assert sorted(results) == [i * 10 for i in range(100)]
+
+
+@pytest.mark.asyncio
+async def test_map_unordered_early_exit():
+    t = Tracker()
+    p = Promise.map_unordered(t.inputs(100), t.factory(), limit=2)
+    async for i in p:
+        break
+    await p.aclose()
+    await asyncio.sleep(.05)
+    assert t.pulled < 10
+
+
+@pytest.mark.asyncio
+async def test_as_completed():
+    t = Tracker()
+    make = t.factory({0: .3, 1: .1, 2: .2, 3: 0}.get, fail={2})
+    promises = [make(i) for i in range(4)]
+    settled = Promise.resolve('ready')
+    await settled
+    start = time.perf_counter()
+    seen = []
+    async for p in Promise.as_completed(*promises, settled):
+        seen.append((p, time.perf_counter() - start))
+    assert [p for p, _ in seen] == [settled, promises[3], promises[1], promises[2], promises[0]]
+    assert seen[2][1] < .2
+    assert promises[2].is_rejected_due_to(ValueError)
+    assert [i async for i in Promise.as_completed()] == []
+
+
+@pytest.mark.asyncio
+async def test_as_completed_early_exit():
+    t = Tracker()
+    promises = [t.factory(lambda i: .05 * i)(i) for i in range(5)]
+    completed = Promise.as_completed(*promises)
+    async for p in completed:
+        break
+    await completed.aclose()
+    await asyncio.sleep(0)
+    assert p is promises[0]
+    assert all(q.is_pending for q in promises[1:])
+
+
+@pytest.mark.asyncio
+async def test_some_quorum():
+    t = Tracker()
+    make = t.factory({0: .3, 1: .01, 2: .05}.get)
+    replicas = [make(i) for i in range(3)]
+    start = time.perf_counter()
+    assert await Promise.some(2, *replicas, concurrently=True) == [10, 20]
+    assert time.perf_counter() - start < .2
+    await asyncio.sleep(0)
+    assert replicas[0].is_pending
+
+
+@pytest.mark.asyncio
+async def test_some_rejects_early():
+    t = Tracker()
+    make = t.factory({0: .3, 1: .01, 2: .02}.get, fail={1, 2})
+    start = time.perf_counter()
+    p = Promise.some(2, *[make(i) for i in range(3)], concurrently=True)
+    with pytest.raises(PromiseAggregateError):
+        await p
+    assert time.perf_counter() - start < .2
+
+
+@pytest.mark.asyncio
+async def test_some_sequential():
+    assert await Promise.some(1, Promise.reject(KeyError()), Promise.resolve(1), Promise.resolve(2)) == [1]
+
+
+class Pages:
+    def __init__(self, count, delay=.02, fail=None):
+        self.count = count
+        self.delay = delay
+        self.fail = fail
+        self.fetched = []
+        self.cancelled = []
+
+    def __call__(self, cursor):
+        cursor = cursor or 0
+
+        async def executor(resolve, reject):
+            try:
+                await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                self.cancelled.append(cursor)
+                raise
+            if cursor == self.fail:
+                raise KeyError(cursor)
+            self.fetched.append(cursor)
+            await resolve(cursor)
+        return Promise(executor)
+
+    def next_cursor(self, page):
+        return page + 1 if page + 1 < self.count else None
+
+
+@pytest.mark.asyncio
+async def test_paginate_prefetch_overlaps():
+    pages = Pages(5)
+    start = time.perf_counter()
+    seen = []
+    async for page in Promise.paginate(pages, pages.next_cursor, prefetch=2):
+        seen.append(page)
+        await asyncio.sleep(.02)
+    assert seen == [0, 1, 2, 3, 4]
+    assert time.perf_counter() - start < .16
+
+    pages = Pages(3)
+    seen = [page async for page in Promise.paginate(pages, pages.next_cursor, prefetch=0)]
+    assert seen == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_paginate_backpressure():
+    pages = Pages(100, delay=0)
+    iterator = Promise.paginate(pages, pages.next_cursor, prefetch=3)
+    assert await iterator.__anext__() == 0
+    await asyncio.sleep(.05)
+    assert pages.fetched == [0, 1, 2, 3]
+    await iterator.__anext__()
+    await asyncio.sleep(.05)
+    assert pages.fetched == [0, 1, 2, 3, 4]
+    await iterator.aclose()
+
+
+@pytest.mark.asyncio
+async def test_paginate_early_exit_and_rejection():
+    pages = Pages(100, delay=.05)
+    async for page in Promise.paginate(pages, pages.next_cursor, prefetch=2):
+        break
+    await asyncio.sleep(.01)
+    assert pages.cancelled == [1]
+    await asyncio.sleep(.1)
+    assert pages.fetched == [0]
+
+    pages = Pages(10, delay=0, fail=2)
+    seen = []
+    with pytest.raises(KeyError):
+        async for page in Promise.paginate(pages, pages.next_cursor):
+            seen.append(page)
+    assert seen == [0, 1]
+    with pytest.raises(ValueError):
+        Promise.paginate(pages, pages.next_cursor, prefetch=-1)
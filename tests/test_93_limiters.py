@@ -0,0 +1,361 @@
+import asyncio
+import time
+
+import pytest
+
+from notcallback.async_ import (AdaptiveLimiter, Bulkhead, ConcurrencyLimiter, Promise, RateLimiter,
+                                 Scheduler)
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+class Gauge:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+
+    def promise(self, value, delay=.01, fail=False):
+        async def executor(resolve, reject):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(delay)
+            self.in_flight -= 1
+            if fail:
+                await reject(ConnectionError(value))
+            await resolve(value)
+        return Promise(executor)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_all():
+    gauge = Gauge()
+    limiter = ConcurrencyLimiter(3)
+    p = Promise.all(*[gauge.promise(i) for i in range(10)], concurrently=True, limiter=limiter)
+    task = asyncio.ensure_future(p.awaitable())
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert limiter.in_flight == 3
+    assert limiter.queue_depth == 7
+    assert await task == list(range(10))
+    assert gauge.peak == 3
+    assert limiter.in_flight == 0
+    assert limiter.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_all_settled():
+    gauge = Gauge()
+    limiter = ConcurrencyLimiter(2)
+    promises = [gauge.promise(i, fail=i % 2) for i in range(6)]
+    await Promise.all_settled(*promises, concurrently=True, limiter=limiter)
+    assert [p.is_rejected for p in promises] == [False, True] * 3
+    assert gauge.peak == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_requires_concurrently():
+    with pytest.raises(ValueError):
+        Promise.all(Promise.resolve(), limiter=ConcurrencyLimiter(1))
+    with pytest.raises(ValueError):
+        ConcurrencyLimiter(0)
+
+
+@pytest.mark.asyncio
+async def test_limiter_run_standalone():
+    limiter = ConcurrencyLimiter(1)
+    assert await limiter.run(Promise.resolve(5)) == 5
+    with pytest.raises(KeyError):
+        await limiter.run(Promise.reject(KeyError()))
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_cancelled_waiter():
+    limiter = ConcurrencyLimiter(1)
+    permit = await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 1
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 0
+    limiter.release(permit)
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_waiter_cancelled_before_release():
+    limiter = ConcurrencyLimiter(1)
+    permit = await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    limiter.release(permit)
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.queue_depth == 0
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_increase():
+    limiter = AdaptiveLimiter(2, max_limit=4)
+    gauge = Gauge()
+    await Promise.all(*[gauge.promise(i, 0) for i in range(100)], concurrently=True, limiter=limiter)
+    assert limiter.limit == 4
+    assert limiter.rejection_rate == 0
+    assert limiter.latency is not None
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_decrease_on_rejection():
+    limiter = AdaptiveLimiter(16, min_limit=2)
+    gauge = Gauge()
+    await Promise.all_settled(*[gauge.promise(i, fail=True) for i in range(8)], concurrently=True, limiter=limiter)
+    # All eight started before the first decrease, so the limit is only halved once.
+    assert limiter.limit == 8
+    await Promise.all_settled(*[gauge.promise(i, fail=True) for i in range(20)], concurrently=True, limiter=limiter)
+    assert limiter.limit == 2
+    assert limiter.rejection_rate > .5
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_latency_threshold():
+    limiter = AdaptiveLimiter(8, latency_threshold=.05)
+    gauge = Gauge()
+    await Promise.all(*[gauge.promise(i, .1) for i in range(4)], concurrently=True, limiter=limiter)
+    assert limiter.limit == 4
+    assert limiter.rejection_rate == 0
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_isolates_keys():
+    gauges = {'slow': Gauge(), 'fast': Gauge()}
+    promises = {}
+    for i in range(6):
+        promises[gauges['slow'].promise(i, .2)] = 'slow'
+    for i in range(6):
+        promises[gauges['fast'].promise(i, .01)] = 'fast'
+    bulkhead = Bulkhead(2, key=promises.get)
+
+    fast = Promise.all(*[p for p, k in promises.items() if k == 'fast'], concurrently=True, limiter=bulkhead)
+    slow = Promise.all(*[p for p, k in promises.items() if k == 'slow'], concurrently=True, limiter=bulkhead)
+    slow_task = asyncio.ensure_future(slow.awaitable())
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert bulkhead.stats('slow').queue_length == 4
+
+    start = time.perf_counter()
+    await fast
+    assert time.perf_counter() - start < .15
+    await slow_task
+    assert gauges['slow'].peak == 2
+    assert gauges['fast'].peak == 2
+    assert bulkhead.stats('slow').max_wait >= .3
+    assert bulkhead.stats('fast').acquired == 6
+    assert bulkhead.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_total_and_overrides():
+    gauge = Gauge()
+    bulkhead = Bulkhead(3, total=4, limits={'b': 1})
+    tasks = [asyncio.ensure_future(bulkhead.run(gauge.promise(i), key='ab'[i % 2])) for i in range(10)]
+    await asyncio.sleep(0)
+    assert bulkhead.stats('a').in_flight == 3
+    assert bulkhead.stats('b').in_flight == 1
+    assert bulkhead.queue_depth == 6
+    assert await asyncio.gather(*tasks) == list(range(10))
+    assert gauge.peak == 4
+    assert set(bulkhead.stats()) == {'a', 'b'}
+    with pytest.raises(ValueError):
+        Bulkhead(0)
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_cancelled_waiter():
+    bulkhead = Bulkhead(2, total=1)
+    permit = await bulkhead.acquire(key='a')
+    waiter = asyncio.ensure_future(bulkhead.acquire(key='a'))
+    await asyncio.sleep(0)
+    assert bulkhead.stats('a').in_flight == 2
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert bulkhead.stats('a').in_flight == 1
+    bulkhead.release(permit)
+    assert bulkhead.in_flight == 0
+    assert bulkhead.queue_depth == 0
+
+
+async def start_order(scheduler, hints):
+    order = []
+    blocker = await scheduler.acquire()
+
+    async def job(name, **kwargs):
+        permit = await scheduler.acquire(**kwargs)
+        order.append(name)
+        await asyncio.sleep(0)
+        scheduler.release(permit)
+
+    tasks = [asyncio.ensure_future(job(name, **kwargs)) for name, kwargs in hints]
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == len(hints)
+    scheduler.release(blocker)
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_scheduler_priority_and_deadline():
+    scheduler = Scheduler(1)
+    order = await start_order(scheduler, [
+        ('batch', {'priority': 5}),
+        ('late', {'deadline': 200}),
+        ('plain', {}),
+        ('urgent', {'priority': -1}),
+        ('soon', {'deadline': 100}),
+    ])
+    assert order == ['urgent', 'soon', 'late', 'plain', 'batch']
+
+
+@pytest.mark.asyncio
+async def test_scheduler_weighted_fair_queueing():
+    scheduler = Scheduler(1, weights={'b': 2})
+    hints = [('a', {'tenant': 'a'})] * 6 + [('b', {'tenant': 'b'})] * 6 + [('c', {'tenant': 'c'})] * 3
+    order = await start_order(scheduler, hints)
+    # Tenant b has twice the weight of a and c, however many Promises each of them queued.
+    assert [order[:8].count(name) for name in 'abc'] == [2, 4, 2]
+    assert sorted(order) == sorted(name for name, _ in hints)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_extractors_with_all():
+    started = []
+
+    def job(name):
+        async def executor(resolve, reject):
+            started.append(name)
+            await asyncio.sleep(.01)
+            await resolve(name)
+        return Promise(executor)
+
+    interactive = [job('i%d' % i) for i in range(3)]
+    batch = [job('b%d' % i) for i in range(6)]
+    urgent = set(interactive)
+    scheduler = Scheduler(2, priority=lambda p: 0 if p in urgent else 1)
+
+    task = asyncio.ensure_future(Promise.all(*batch, concurrently=True, limiter=scheduler).awaitable())
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert await Promise.all(*interactive, concurrently=True, limiter=scheduler) == ['i0', 'i1', 'i2']
+    assert await task == ['b%d' % i for i in range(6)]
+    assert started[:5] == ['b0', 'b1', 'i0', 'i1', 'i2']
+
+
+@pytest.mark.asyncio
+async def test_scheduler_with_map():
+    scheduler = Scheduler(1, priority=lambda p: -p.priority)
+    t_started = []
+
+    def factory(i):
+        async def executor(resolve, reject):
+            t_started.append(i)
+            await asyncio.sleep(0)
+            await resolve(i)
+        p = Promise(executor)
+        p.priority = i
+        return p
+
+    blocker = await scheduler.acquire()
+    task = asyncio.ensure_future(Promise.map(range(5), factory, limiter=scheduler).awaitable())
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    scheduler.release(blocker)
+    assert await task == list(range(5))
+    assert t_started == [4, 3, 2, 1, 0]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_cancelled_waiter():
+    scheduler = Scheduler(1)
+    permit = await scheduler.acquire()
+    waiter = asyncio.ensure_future(scheduler.acquire(priority=-1))
+    other = asyncio.ensure_future(scheduler.acquire(priority=1))
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 2
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 1
+    scheduler.release(permit)
+    scheduler.release(await other)
+    assert scheduler.in_flight == 0
+    assert scheduler.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_all():
+    started = []
+
+    def job(i):
+        async def executor(resolve, reject):
+            started.append(time.perf_counter())
+            await resolve(i)
+        return Promise(executor)
+
+    limiter = RateLimiter(100, burst=5)
+    start = time.perf_counter()
+    assert await Promise.all(*[job(i) for i in range(15)], concurrently=True, limiter=limiter) == list(range(15))
+    duration = time.perf_counter() - start
+    assert .09 <= duration < .2
+    assert started[4] - start < .01
+    assert started[5] - start >= .009
+    assert limiter.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_single_timer():
+    limiter = RateLimiter(10000, burst=1)
+    tasks = [asyncio.ensure_future(limiter.acquire()) for _ in range(1000)]
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 999
+    handles = asyncio.get_event_loop()._scheduled
+    assert sum(1 for h in handles if not h.cancelled()) == 1
+    await asyncio.gather(*tasks)
+    assert limiter.queue_depth == 0
+    assert limiter._timer is None
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_standalone_and_cancel():
+    limiter = RateLimiter(20, burst=2)
+    assert await limiter.run(Promise.resolve(1)) == 1
+    await limiter.acquire(cost=1)
+    waiter = asyncio.ensure_future(limiter.acquire(cost=2))
+    second = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 2
+    waiter.cancel()
+    start = time.perf_counter()
+    await second
+    assert time.perf_counter() - start < .07
+    assert limiter.queue_depth == 0
+    with pytest.raises(ValueError):
+        await limiter.acquire(cost=3)
+    with pytest.raises(ValueError):
+        RateLimiter(0)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_cancelled_as_timer_fires():
+    limiter = RateLimiter(100, burst=1)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    # The refill timer fires after the task is cancelled, but before it resumes.
+    waiter.cancel()
+    limiter._drain()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert limiter.queue_depth == 0
+    await asyncio.wait_for(limiter.acquire(), .1)
@@ -0,0 +1,177 @@
+import asyncio
+import time
+
+import pytest
+
+from notcallback.async_ import Promise
+from notcallback.exceptions import PromiseException, PromiseTimeout
+from notcallback.timers import TimerHeap, timers_for
+
+from .suppliers import sleep
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+def never(cleanup=None):
+    def executor(resolve, reject):
+        try:
+            value = yield asyncio.get_event_loop().create_future()
+            yield from resolve(value)
+        finally:
+            if cleanup is not None:
+                cleanup.append(True)
+    return executor
+
+
+@pytest.mark.asyncio
+async def test_timeout_rejects_pending():
+    cleanup = []
+    p = Promise(never(cleanup)).timeout(.05)
+    assert p.deadline is not None
+    start = time.perf_counter()
+    with pytest.raises(PromiseTimeout) as info:
+        await p
+    assert .04 < time.perf_counter() - start < .2
+    assert p.is_rejected_due_to(TimeoutError)
+    assert not isinstance(info.value, PromiseException)
+    assert info.value.promise is p
+    assert cleanup == [True]
+
+
+@pytest.mark.asyncio
+async def test_timeout_not_reached():
+    loop = asyncio.get_running_loop()
+    p = Promise(sleep(.01, 'done')).timeout(1)
+    assert await p == 'done'
+    assert len(timers_for(loop)) == 0
+    assert await Promise.resolve(1).timeout(0) == 1
+
+
+@pytest.mark.asyncio
+async def test_timeout_handled():
+    p = Promise(never()).timeout(.01).then(lambda v: 'fulfilled', lambda e: type(e))
+    assert await p is PromiseTimeout
+
+
+@pytest.mark.asyncio
+async def test_timeout_running_promise():
+    p = Promise(sleep(1, 'late'), eager=True)
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    with pytest.raises(PromiseTimeout):
+        await p.timeout(.05)
+    assert time.perf_counter() - start < .5
+
+    cleanup = []
+    p = Promise(never(cleanup))
+    awaiting = asyncio.ensure_future(p.awaitable())
+    await asyncio.sleep(0)
+    p.timeout(.05)
+    with pytest.raises(PromiseTimeout):
+        await awaiting
+    assert p.is_rejected_due_to(PromiseTimeout)
+    assert cleanup == [True]
+    assert not awaiting.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_timeout_running_promise_not_reached():
+    loop = asyncio.get_running_loop()
+    p = Promise(sleep(.01, 'done'), eager=True)
+    await asyncio.sleep(0)
+    assert await p.timeout(1) == 'done'
+    assert len(timers_for(loop)) == 0
+
+
+@pytest.mark.asyncio
+async def test_deadline_propagates_to_handlers():
+    async def slow(value):
+        await asyncio.sleep(1)
+        return value
+
+    p = Promise.resolve(1).timeout(.05)
+    child = p.then(slow)
+    assert child.deadline == p.deadline
+    start = time.perf_counter()
+    with pytest.raises(PromiseTimeout):
+        await child
+    assert time.perf_counter() - start < .2
+    assert p.is_fulfilled
+
+
+@pytest.mark.asyncio
+async def test_deadline_propagates_from_parent():
+    p = Promise(sleep(1)).timeout(.05)
+    child = p.then(lambda v: v).finally_(lambda: None)
+    with pytest.raises(PromiseTimeout) as info:
+        await child
+    assert info.value.promise is p
+    assert p.is_rejected and child.is_rejected
+
+
+@pytest.mark.asyncio
+async def test_earlier_deadline_on_child():
+    p = Promise(sleep(.3, 'slow')).timeout(1)
+    child = p.then(lambda v: v).timeout(.05)
+    with pytest.raises(PromiseTimeout) as info:
+        await child
+    assert info.value.promise is child
+    assert p.is_pending
+    p.timeout(2)
+    assert p.deadline < asyncio.get_running_loop().time() + 1
+
+
+@pytest.mark.asyncio
+async def test_timeout_async_iteration():
+    def executor(resolve, reject):
+        yield 1
+        yield asyncio.sleep(1)
+        yield 2
+        yield from resolve()
+
+    p = Promise(executor).timeout(.05)
+    items = []
+    async for i in p:
+        items.append(i)
+    assert items == [1]
+    assert p.is_rejected_due_to(PromiseTimeout)
+
+
+@pytest.mark.asyncio
+async def test_deadlines_share_one_timer():
+    loop = asyncio.get_running_loop()
+    scheduled = len(loop._scheduled)
+    promises = [Promise(never()).timeout(10 + i * 1e-5) for i in range(2000)]
+    tasks = [asyncio.ensure_future(p.awaitable()) for p in promises]
+    await asyncio.sleep(0)
+    assert len(timers_for(loop)) == 2000
+    assert len(loop._scheduled) == scheduled + 1
+    for task in tasks:
+        task.cancel()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert len(timers_for(loop)) == 0
+
+
+@pytest.mark.asyncio
+async def test_timer_heap():
+    loop = asyncio.get_running_loop()
+    heap = TimerHeap(loop)
+    fired = []
+    now = loop.time()
+    timers = [heap.call_at(now + .01 * (i % 5), lambda i=i: fired.append(i)) for i in range(10)]
+    for t in timers[::2]:
+        t.cancel()
+    assert len(heap) == 5
+    heap.call_later(0, lambda: fired.append('later'))
+    await asyncio.sleep(.1)
+    assert fired == [5, 'later', 1, 7, 3, 9]
+    assert len(heap) == 0
+
+    many = [heap.call_later(10, lambda: None) for _ in range(200)]
+    for t in many[:150]:
+        t.cancel()
+    assert len(heap._heap) < 200
+    assert len(heap) == 50
+    for t in many[150:]:
+        t.cancel()
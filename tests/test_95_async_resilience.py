@@ -0,0 +1,219 @@
+import asyncio
+import time
+
+import pytest
+
+from notcallback.async_ import Promise
+from notcallback.exceptions import AdmissionRejected, CircuitOpenError
+from notcallback.resilience import (CLOSED, OPEN, AdmissionController, CircuitBreaker, LatencyTracker,
+                                    RetryBudget)
+
+from .suppliers import sleeper
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+class Flaky:
+    def __init__(self, failures, delay=0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self):
+        self.calls.append(time.perf_counter())
+        failing = len(self.calls) <= self.failures
+
+        async def executor(resolve, reject):
+            await asyncio.sleep(self.delay)
+            if failing:
+                raise ConnectionError(len(self.calls))
+            await resolve('ok')
+        return Promise(executor)
+
+
+@pytest.mark.asyncio
+async def test_retry_backoff():
+    flaky = Flaky(3)
+    start = time.perf_counter()
+    assert await Promise.retry(flaky, attempts=4, backoff=.02) == 'ok'
+    gaps = [b - a for a, b in zip([start] + flaky.calls, flaky.calls)]
+    assert gaps[1] >= .015 and gaps[2] >= .035 and gaps[3] >= .075
+
+
+@pytest.mark.asyncio
+async def test_retry_does_not_block_loop():
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(True)
+            await asyncio.sleep(.01)
+
+    task = asyncio.ensure_future(ticker())
+    with pytest.raises(ConnectionError):
+        await Promise.retry(Flaky(5), attempts=3, backoff=.03, max_backoff=.03, jitter=1)
+    await task
+    assert len(ticks) == 5
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_shared():
+    budget = RetryBudget(0, reserve=3)
+    results = await Promise.all_settled(
+        *[Promise.retry(Flaky(10), attempts=5, budget=budget) for _ in range(4)], concurrently=True,
+    )
+    assert all(p.is_rejected for p in results)
+    assert budget.retries == 3
+    assert budget.calls == 4
+
+
+class Replica:
+    def __init__(self, delays, fail=()):
+        self.delays = list(delays)
+        self.fail = fail
+        self.started = []
+        self.finished = []
+
+    def __call__(self):
+        n = len(self.started)
+        self.started.append(time.perf_counter())
+
+        async def executor(resolve, reject):
+            await asyncio.sleep(self.delays[n])
+            self.finished.append(n)
+            if n in self.fail:
+                raise ConnectionResetError(n)
+            await resolve(n)
+        return Promise(executor)
+
+
+@pytest.mark.asyncio
+async def test_hedge_backup_wins():
+    replica = Replica([1, .01])
+    start = time.perf_counter()
+    assert await Promise.hedge(replica, delay=.05) == 1
+    assert .05 <= time.perf_counter() - start < .2
+    assert len(replica.started) == 2
+    await asyncio.sleep(0)
+    assert replica.finished == [1]
+
+
+@pytest.mark.asyncio
+async def test_hedge_fast_first():
+    replica = Replica([.01, .01])
+    assert await Promise.hedge(replica, delay=.1, max_hedges=3) == 0
+    assert len(replica.started) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_rejection_launches_next():
+    replica = Replica([.01, .01, .01], fail={0, 1})
+    start = time.perf_counter()
+    assert await Promise.hedge(replica, delay=1, max_hedges=2) == 2
+    assert time.perf_counter() - start < .2
+
+    replica = Replica([.01, .01], fail={0, 1})
+    with pytest.raises(ConnectionResetError) as info:
+        await Promise.hedge(replica, delay=1)
+    assert info.value.args == (1,)
+
+
+@pytest.mark.asyncio
+async def test_hedge_adaptive_delay():
+    tracker = LatencyTracker(.95, default=1)
+    assert tracker() == 1
+    for _ in range(20):
+        await Promise.hedge(Replica([.01]), delay=tracker)
+    assert len(tracker) == 20
+    assert .005 < tracker() < .05
+    replica = Replica([1, .01])
+    start = time.perf_counter()
+    assert await Promise.hedge(replica, delay=tracker) == 1
+    assert time.perf_counter() - start < .2
+
+
+@pytest.mark.asyncio
+async def test_hedge_coroutine_factory():
+    async def call():
+        await asyncio.sleep(.01)
+        return 'done'
+
+    assert await Promise.hedge(call, delay=.1) == 'done'
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_async():
+    breaker = CircuitBreaker(Promise, minimum_calls=2, window=4, open_for=.05)
+    flaky = breaker.wrap(Flaky(2, delay=.01))
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await flaky()
+    assert breaker.state is OPEN
+    refused = flaky()
+    assert isinstance(refused, Promise)
+    assert refused.is_rejected
+    with pytest.raises(CircuitOpenError):
+        await refused
+    await asyncio.sleep(.05)
+    assert await flaky() == 'ok'
+    assert breaker.state is CLOSED
+
+
+@pytest.mark.asyncio
+async def test_admission_controller_queues_with_bounded_wait():
+    controller = AdmissionController(Promise, max_pending=1, max_wait=.2, max_queue=1)
+    running = controller.call(sleeper, 1)
+    running.start()
+    queued = controller.call(sleeper, 2)
+    assert controller.queued == 1
+    shed = controller.call(sleeper, 3)
+    assert shed.is_rejected
+    assert await running == 1
+    assert await queued == 2
+    assert controller.pending() == 0
+    assert controller.queued == 0
+
+    controller.call(sleeper, 4, delay=.5).start()
+    start = time.perf_counter()
+    with pytest.raises(AdmissionRejected):
+        await controller.call(sleeper, 5)
+    assert .15 < time.perf_counter() - start < .3
+    assert controller.shed == 2
+
+
+@pytest.mark.asyncio
+async def test_admission_controller_cancelled_waiter():
+    controller = AdmissionController(Promise, max_pending=1, max_wait=1)
+    running = controller.call(sleeper, 1)
+    running.start()
+    queued = controller.call(sleeper, 2)
+    await asyncio.sleep(0)
+    queued.start().cancel()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert controller.queued == 0
+    assert queued.is_pending
+    assert await running == 1
+    assert controller.pending() == 0
+    assert await controller.call(sleeper, 3) == 3
+
+
+@pytest.mark.asyncio
+async def test_admission_controller_release_before_abandon():
+    def held(resolve, reject):
+        yield 'held'
+        yield from resolve(1)
+
+    controller = AdmissionController(Promise, max_pending=1, max_wait=1)
+    running = controller.call(Promise, held)
+    queued = controller.call(sleeper, 2)
+    await asyncio.sleep(0)
+    waiter = controller._queue[0][0]
+    # The waiter is cancelled, e.g. by its timeout, and a slot frees up before its done-callback runs.
+    waiter.cancel()
+    assert Promise.settle(running).is_fulfilled
+    assert controller.queued == 0
+    assert controller.pending() == 0
+    await asyncio.sleep(0)
+    assert controller.queued == 0
+    assert await controller.call(sleeper, 3) == 3
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from notcallback.async_ import Promise
+from notcallback.caching import memoize_promise
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+@pytest.mark.asyncio
+async def test_memoize_async_single_flight():
+    calls = []
+
+    @memoize_promise(promise_class=Promise, negative_ttl=0)
+    def fetch(key):
+        calls.append(key)
+
+        async def executor(resolve, reject):
+            await asyncio.sleep(.01)
+            if key < 0:
+                raise ValueError(key)
+            await resolve(key * 2)
+        return Promise(executor)
+
+    assert await asyncio.gather(*[fetch(1).awaitable() for _ in range(10)]) == [2] * 10
+    assert await fetch(1) == 2
+    assert calls == [1]
+    assert fetch.cache.info().coalesced == 9
+    assert fetch.cache.info().hits == 1
+
+    for _ in range(2):
+        results = await asyncio.gather(*[fetch(-1).awaitable() for _ in range(3)], return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+    assert calls == [1, -1, -1]
+
+
+@pytest.mark.asyncio
+async def test_memoize_async_cancelled_caller():
+    @memoize_promise(promise_class=Promise)
+    def fetch():
+        async def executor(resolve, reject):
+            await asyncio.sleep(.02)
+            await resolve('ok')
+        return Promise(executor)
+
+    impatient = asyncio.ensure_future(fetch().awaitable())
+    await asyncio.sleep(0)
+    impatient.cancel()
+    assert await fetch() == 'ok'
+    assert fetch.cache.info().misses == 1
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from notcallback.async_ import Promise
+from notcallback.batching import BatchLoader, WriteBehind
+from notcallback.promise import Promise as BasePromise
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+class Table:
+    def __init__(self):
+        self.queries = []
+
+    async def fetch(self, ids):
+        self.queries.append(ids)
+        await asyncio.sleep(.01)
+        return [KeyError(i) if i < 0 else 'row%d' % i for i in ids]
+
+
+@pytest.mark.asyncio
+async def test_batch_loader_per_tick():
+    table = Table()
+    loader = BatchLoader(table.fetch, Promise)
+
+    async def handler(i):
+        await asyncio.sleep(0)
+        return await loader.load(i % 50)
+
+    rows = await asyncio.gather(*[handler(i) for i in range(500)])
+    assert rows == ['row%d' % (i % 50) for i in range(500)]
+    assert table.queries == [list(range(50))]
+    assert await loader.load(7) == 'row7'
+    assert await loader.load(-1).catch(lambda e: type(e).__name__) == 'KeyError'
+    assert len(table.queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_loader_max_batch_size():
+    table = Table()
+    loader = BatchLoader(table.fetch, Promise, max_batch_size=10, cache=False)
+    assert await loader.load_many(range(25)) == ['row%d' % i for i in range(25)]
+    assert [len(q) for q in table.queries] == [10, 10, 5]
+    assert await Promise.all(loader.load(1), loader.load(2), concurrently=True) == ['row1', 'row2']
+    assert len(table.queries) == 4
+
+
+@pytest.mark.asyncio
+async def test_batch_loader_awaited_directly():
+    loader = BatchLoader(lambda ids: [i * 2 for i in ids], Promise)
+    first = loader.load(1)
+    second = loader.load(2)
+    assert await first == 2
+    assert await second == 4
+    assert loader.batches == 1
+
+
+class Sink:
+    def __init__(self, delay=.01, fail=()):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+        self.concurrent = 0
+        self.peak = 0
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        self.concurrent += 1
+        self.peak = max(self.peak, self.concurrent)
+        await asyncio.sleep(self.delay)
+        self.concurrent -= 1
+        if set(items) & set(self.fail):
+            raise ConnectionError(items)
+        return len(items)
+
+
+@pytest.mark.asyncio
+async def test_write_behind_size_and_time():
+    sink = Sink()
+    writer = WriteBehind(sink, max_batch=4, max_delay=.05)
+    promises = [writer.write(i) for i in range(10)]
+    assert sink.batches == []
+    await asyncio.sleep(0)
+    assert sink.batches == [[0, 1, 2, 3]]
+    assert await promises[0] == 4
+    assert await promises[9] == 2
+    assert sink.batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert sink.peak == 1
+    assert writer.buffered == 0
+
+
+@pytest.mark.asyncio
+async def test_write_behind_errors_and_concurrency():
+    sink = Sink(fail=[5])
+    writer = WriteBehind(sink, max_batch=2, max_flushes=2)
+    promises = [writer.write(i) for i in range(8)]
+    await writer.close()
+    assert sink.peak == 2
+    assert writer.flushed == 4
+    results = await asyncio.gather(*[p.awaitable() for p in promises], return_exceptions=True)
+    assert [isinstance(r, ConnectionError) for r in results] == [False] * 4 + [True] * 2 + [False] * 2
+
+
+@pytest.mark.asyncio
+async def test_write_behind_drain():
+    sink = Sink(delay=.02)
+    writer = WriteBehind(sink, max_batch=5, max_buffer=10)
+    peak = 0
+    for i in range(50):
+        writer.write(i)
+        peak = max(peak, writer.buffered)
+        await writer.drain()
+    await writer.close()
+    assert peak <= 10
+    assert sum(sink.batches, []) == list(range(50))
+    with pytest.raises(ValueError):
+        WriteBehind(sink, BasePromise)
@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from notcallback.async_ import Promise
+from notcallback.exceptions import PromiseCancelled
+
+from .suppliers import RemoteConnection
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+def fetch(conn, delay=1):
+    def executor(resolve, reject):
+        rows = yield conn.query(delay)
+        yield from resolve(rows)
+    return Promise(executor).finally_(conn.close)
+
+
+@pytest.mark.asyncio
+async def test_cancel_started_promise():
+    conn = RemoteConnection()
+    p = fetch(conn)
+    handled = []
+    child = p.then(handled.append)
+    p.start()
+    await asyncio.sleep(0)
+    assert p.cancel()
+    with pytest.raises(PromiseCancelled):
+        await p
+    assert conn.interrupted
+    assert conn.closed
+    assert p.is_cancelled
+    with pytest.raises(PromiseCancelled):
+        await child
+    assert handled == []
+
+
+@pytest.mark.asyncio
+async def test_cancel_awaited_promise():
+    conn = RemoteConnection()
+    p = fetch(conn)
+    awaiting = asyncio.ensure_future(p.awaitable())
+    await asyncio.sleep(0)
+    p.cancel('shutting down')
+    with pytest.raises(PromiseCancelled) as info:
+        await awaiting
+    assert info.value.reason == 'shutting down'
+    assert conn.interrupted
+    assert conn.closed
+    assert not awaiting.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_cancel_unstarted_promise():
+    conn = RemoteConnection()
+    query = Promise(lambda resolve, reject: (yield from resolve((yield conn.query()))))
+    p = query.finally_(conn.close)
+    query.cancel()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert query.is_cancelled
+    assert p.is_cancelled
+    assert not conn.interrupted
+    assert conn.closed
+
+
+@pytest.mark.asyncio
+async def test_task_cancel_still_leaves_promise_pending():
+    conn = RemoteConnection()
+    p = fetch(conn)
+    task = p.start()
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert p.is_pending
+    assert p.cancel()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert p.is_cancelled
+    assert conn.closed
+
+
+@pytest.mark.asyncio
+async def test_cancel_async_iteration():
+    def executor(resolve, reject):
+        yield 1
+        yield asyncio.sleep(1)
+        yield from resolve(2)
+
+    p = Promise(executor)
+    items = []
+
+    async def consume():
+        async for item in p:
+            items.append(item)
+
+    task = asyncio.ensure_future(consume())
+    await asyncio.sleep(0)
+    p.cancel()
+    await task
+    assert items == [1]
+    assert p.is_cancelled
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('eager', [False, True])
+async def test_cancel_one_branch(eager):
+    conn = RemoteConnection()
+    p = Promise(lambda resolve, reject: (yield from resolve((yield conn.query(.01)))), eager=eager)
+    first = p.then(lambda rows: rows.upper())
+    second = p.then(lambda rows: rows * 2)
+    task = first.start()
+    await asyncio.sleep(0)
+    assert first.cancel()
+    with pytest.raises(PromiseCancelled):
+        await first
+    assert task.done()
+    assert p.is_pending
+    assert await second == 'rowsrows'
+    assert not conn.interrupted
+
+
+@pytest.mark.asyncio
+async def test_cancel_last_branch():
+    conn = RemoteConnection()
+    p = Promise(lambda resolve, reject: (yield from resolve((yield conn.query()))))
+    child = p.then(lambda rows: rows.upper())
+    task = child.start()
+    await asyncio.sleep(0)
+    assert child.cancel()
+    with pytest.raises(PromiseCancelled):
+        await child
+    assert task.done()
+    assert p.is_cancelled
+    assert conn.interrupted
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('eager', [False, True])
+async def test_cancel_last_branch_of_awaited_promise(eager):
+    conn = RemoteConnection()
+    p = Promise(lambda resolve, reject: (yield from resolve((yield conn.query(.01)))), eager=eager)
+    awaiting = asyncio.ensure_future(p.awaitable())
+    await asyncio.sleep(0)
+    child = p.then(lambda rows: rows.upper())
+    task = child.start()
+    await asyncio.sleep(0)
+    assert child.cancel()
+    with pytest.raises(PromiseCancelled):
+        await child
+    assert task.done()
+    assert p.is_pending
+    assert await awaiting == 'rows'
+    assert not conn.interrupted
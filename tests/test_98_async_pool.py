@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from notcallback.async_ import Promise
+from notcallback.pool import Pool
+
+from .suppliers import Connection
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+class Factory:
+    def __init__(self, fail=0):
+        self.created = 0
+        self.fail = fail
+
+    async def __call__(self):
+        await asyncio.sleep(.001)
+        self.created += 1
+        if self.created <= self.fail:
+            raise ConnectionError()
+        return Connection(self.created)
+
+
+@pytest.mark.asyncio
+async def test_pool_fifo_waiters():
+    pool = Pool(Factory(), Promise, max_size=2)
+    order = []
+
+    def job(i):
+        async def handler(conn):
+            order.append(i)
+            await asyncio.sleep(.01)
+            return conn.id
+        return pool.use(handler)
+
+    ids = await Promise.all(*[job(i) for i in range(6)], concurrently=True)
+    assert set(ids) == {1, 2}
+    assert order == list(range(6))
+    assert (pool.size, pool.idle, pool.waiting) == (2, 2, 0)
+
+
+@pytest.mark.asyncio
+async def test_pool_cancelled_waiter():
+    pool = Pool(Factory(), Promise, max_size=1)
+    conn = await pool.acquire()
+    waiter = pool.acquire()
+    task = waiter.start()
+    await asyncio.sleep(0)
+    assert pool.waiting == 1
+    task.cancel()
+    await asyncio.sleep(0)
+    assert pool.waiting == 0
+    pool.release(conn)
+    assert pool.idle == 1
+    assert await pool.acquire() is conn
+
+
+@pytest.mark.asyncio
+async def test_pool_create_failure_wakes_waiter():
+    factory = Factory(fail=1)
+    pool = Pool(factory, Promise, max_size=1)
+    results = await Promise.all_settled(pool.acquire(), pool.acquire(), concurrently=True)
+    assert [p.is_fulfilled for p in results] == [False, True]
+    assert pool.size == 1
+    await pool.warm_up(1)
+    assert factory.created == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_close_rejects_waiters():
+    pool = Pool(Factory(), Promise, max_size=1)
+    conn = await pool.acquire()
+    waiter = pool.acquire()
+    waiter.start()
+    await asyncio.sleep(0)
+    pool.close()
+    with pytest.raises(RuntimeError):
+        await waiter
+    assert waiter.is_rejected_due_to(RuntimeError)
+    pool.release(conn)
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from notcallback.async_ import Promise
+
+from .suppliers import sleeper
+
+pytestmark = pytest.mark.filterwarnings('ignore::notcallback.exceptions.UnhandledPromiseRejectionWarning')
+
+
+@pytest.mark.asyncio
+async def test_scope_waits_for_all():
+    async with Promise.scope() as s:
+        promises = [s.start(sleeper(i, delay=.01 * i)) for i in range(5)]
+        assert len(s) == 5
+    assert len(s) == 0
+    assert [p.value for p in promises] == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_scope_first_error_cancels_siblings():
+    log = []
+    with pytest.raises(KeyError):
+        async with Promise.scope() as s:
+            slow = s.start(sleeper('slow', delay=1, log=log))
+            s.start(sleeper(KeyError('boom'), delay=.01))
+            fast = s.start(sleeper('fast', delay=0, log=log))
+    assert fast.value == 'fast'
+    assert slow.is_cancelled
+    await asyncio.sleep(0)
+    assert log == ['fast']
+
+
+@pytest.mark.asyncio
+async def test_scope_body_error_cancels_children():
+    with pytest.raises(ValueError):
+        async with Promise.scope() as s:
+            child = s.start(sleeper(1, delay=1))
+            raise ValueError()
+    assert child.is_cancelled
+
+
+@pytest.mark.asyncio
+async def test_scope_host_cancelled():
+    children = []
+
+    async def host():
+        async with Promise.scope() as s:
+            children.append(s.start(sleeper(1, delay=1)))
+            children.append(s.start(sleeper(2, delay=1)))
+
+    task = asyncio.ensure_future(host())
+    await asyncio.sleep(.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert all(p.is_cancelled for p in children)
+
+
+@pytest.mark.asyncio
+async def test_scope_coroutines_and_closed():
+    async def call():
+        await asyncio.sleep(.01)
+        return 'done'
+
+    async with Promise.scope() as s:
+        p = s.start(call())
+        settled = s.start(Promise.resolve(1))
+    assert p.value == 'done'
+    assert await settled == 1
+    with pytest.raises(RuntimeError):
+        s.start(Promise.resolve(2))
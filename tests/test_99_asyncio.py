@@ -1,4 +1,5 @@
 import asyncio
+import gc
 import random
 import sys  # noqa
 import time
@@ -17,6 +18,12 @@ RNG = random.Random(SEED)
 print(f'RNG seed: {SEED}')
 
 
+@pytest.fixture(autouse=True)
+def collect_garbage():
+    # Timings are checked to the millisecond: do not let a collection of earlier tests' garbage land in them.
+    gc.collect()
+
+
 def timer():
     start = time.perf_counter()
     yield start